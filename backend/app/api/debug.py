@@ -0,0 +1,89 @@
+"""
+Debug API - On-demand profiling of live workers
+Only mounted when DEBUG or PROFILING_ENABLED is set; every call needs X-Admin-Key
+"""
+import asyncio
+import hmac
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse, Response
+
+from app.core import profiling
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+settings = get_settings()
+
+
+def profiling_available() -> bool:
+    return settings.debug or settings.profiling_enabled
+
+
+def is_admin_key(key: Optional[str]) -> bool:
+    if not settings.admin_api_key or not key:
+        return False
+    return hmac.compare_digest(key.encode(), settings.admin_api_key.encode())
+
+
+async def require_admin(x_admin_key: Optional[str] = Header(None)) -> None:
+    """Reject callers without the configured admin API key"""
+    if not is_admin_key(x_admin_key):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin key required"
+        )
+
+
+@router.post("/profile", dependencies=[Depends(require_admin)])
+async def profile_worker(
+    seconds: float = Query(5.0, gt=0, description="Sampling duration"),
+    interval_ms: float = Query(5.0, ge=1, description="Sampling interval"),
+    include_idle: bool = Query(False, description="Keep stacks of parked threads")
+):
+    """
+    Sample all threads of this worker and return collapsed stacks
+    
+    Output is one "thread;outer;...;leaf count" line per stack, ready for
+    flamegraph.pl, speedscope or inferno.
+    """
+    seconds = min(seconds, settings.profiling_max_seconds)
+    logger.info(f"Profiling worker for {seconds:.1f}s")
+    collapsed = await asyncio.to_thread(
+        profiling.profile_worker, seconds, interval_ms / 1000, include_idle
+    )
+    if collapsed is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already running"
+        )
+    return PlainTextResponse(collapsed)
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_request_profile(
+    profile_id: str,
+    format: str = Query("text", pattern="^(text|pstats)$")
+):
+    """
+    Fetch a single-request cProfile capture
+    
+    Requests sent with "X-Profile: 1" (or "true") and a valid X-Admin-Key have their
+    try-on CV job profiled; the response carries the id in X-Profile-Id.
+    format=pstats returns the binary dump for snakeviz or flameprof.
+    """
+    profile = profiling.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    if format == "pstats":
+        return Response(
+            profiling.pstats_dump(profile),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.pstats"'}
+        )
+    return PlainTextResponse(profiling.pstats_text(profile))
@@ -0,0 +1,285 @@
+"""
+Async render jobs for high-resolution try-on
+Submit an image and watch IDs, get a job ID immediately, then poll or
+long-poll while a background pool renders each watch
+"""
+import asyncio
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from fastapi import APIRouter, File, Form, HTTPException, Query, Response, UploadFile, status
+from fastapi.responses import FileResponse
+
+from app.api.tryon import (
+    ALLOWED_EXTENSIONS, WATCHES_DB, ImageDecodeError, ImageEncodeError, get_watch_image_path,
+    get_watch_tryon, validate_image_size
+)
+from app.core import metrics
+from app.core.config import get_settings
+from app.core.job_store import JobResult, JobState, JobStore
+from app.core.tiers import ModelTier, get_tier
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+settings = get_settings()
+
+MAX_WATCHES_PER_JOB = 16
+MAX_WAIT_SECONDS = 30
+OUTPUT_FORMATS = {"png": ('.png', []), "jpg": ('.jpg', [cv2.IMWRITE_JPEG_QUALITY, 92])}
+
+
+def detect_job_image(image_data: bytes, watch_path: str, tier: ModelTier) -> Tuple[np.ndarray, dict]:
+    """Decode and detect once per job; detection does not depend on the watch"""
+    with metrics.stage("imdecode"):
+        img = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ImageDecodeError("Could not decode image")
+    img = validate_image_size(img)
+    return img, get_watch_tryon(watch_path).process_frame(img, tier=tier)
+
+
+def render_job_output(img: np.ndarray, detection: dict, watch_path: str, output_format: str, out_path: Path) -> None:
+    """Render one watch onto a copy of the job image and write it to disk"""
+    frame = img.copy()
+    if detection.get("hands_detected"):
+        frame = get_watch_tryon(watch_path).render(frame, detection)
+    ext, params = OUTPUT_FORMATS[output_format]
+    with metrics.stage("encode"):
+        success, buffer = cv2.imencode(ext, frame, params)
+    if not success:
+        raise ImageEncodeError(f"Failed to encode result as {ext}")
+    tmp = out_path.with_suffix(".tmp")
+    tmp.write_bytes(buffer.tobytes())
+    tmp.replace(out_path)
+
+
+def check_watch_ids(watch_ids: List[str]) -> None:
+    """Reject watch IDs missing from the catalog, which would otherwise render the default watch"""
+    unknown = [w for w in watch_ids if w not in WATCHES_DB]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown watch IDs: {', '.join(unknown)}"
+        )
+
+
+class RenderJobs:
+    """Runs render jobs on a dedicated thread pool, apart from the
+    interactive CV workers, and wakes long-polling clients on progress"""
+
+    def __init__(self, store: JobStore, workers: int, max_pending: int):
+        self.store = store
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="render-job")
+        self._slots = asyncio.Semaphore(max(1, workers))
+        self._pending = 0
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def submit(self, image: bytes, watch_ids: List[str], output_format: str, tier: ModelTier) -> JobState:
+        """Store the input and start the job
+        
+        Raises:
+            HTTPException: 400 for unknown watch IDs, 503 when too many jobs are pending
+        """
+        check_watch_ids(watch_ids)
+        if self._pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many render jobs in progress",
+                headers={"Retry-After": "30"}
+            )
+        # Reserved before the disk work, so concurrent submits cannot overshoot max_pending
+        self._pending += 1
+        try:
+            job = await asyncio.to_thread(self._create, image, watch_ids, output_format, tier)
+        except BaseException:
+            self._pending -= 1
+            raise
+        self._changed[job.job_id] = asyncio.Event()
+        self._tasks[job.job_id] = asyncio.create_task(self._run(job, image, tier))
+        return job
+
+    def _create(self, image: bytes, watch_ids: List[str], output_format: str, tier: ModelTier) -> JobState:
+        """Sweep expired jobs and write the new job's input (blocking)"""
+        self.store.sweep()
+        return self.store.create(watch_ids, output_format, tier.name, image)
+
+    async def _notify(self, job: JobState) -> None:
+        """Persist the job's state off the event loop, then wake its long-pollers"""
+        await asyncio.to_thread(self.store.save, job)
+        event = self._changed.pop(job.job_id, None)
+        if event is not None:
+            event.set()
+        if not job.final:
+            self._changed[job.job_id] = asyncio.Event()
+
+    async def get(self, job_id: str) -> Optional[JobState]:
+        """Job state; reads the store off the event loop, as it may rewrite stale jobs"""
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[JobState]:
+        """Current state, after waiting up to timeout for the next change of an unfinished job"""
+        # Event first: a change landing while the state is read still wakes this waiter
+        event = self._changed.get(job_id)
+        job = await self.get(job_id)
+        if job is None or job.final or event is None or timeout <= 0:
+            return job
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return await self.get(job_id)
+
+    async def _run(self, job: JobState, image: bytes, tier: ModelTier) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._slots:
+                job.status = "running"
+                await self._notify(job)
+                watch_paths = {w: str(get_watch_image_path(w)) for w in job.watch_ids}
+                img, detection = await loop.run_in_executor(
+                    self._executor, detect_job_image, image, watch_paths[job.watch_ids[0]], tier
+                )
+                del image
+                for watch_id in job.watch_ids:
+                    filename = f"{re.sub(r'[^A-Za-z0-9_-]', '_', watch_id)}.{job.output_format}"
+                    result = JobResult(watch_id=watch_id, hands_detected=bool(detection.get("hands_detected")))
+                    try:
+                        await loop.run_in_executor(
+                            self._executor, render_job_output, img, detection, watch_paths[watch_id],
+                            job.output_format, self.store.output_path(job, filename)
+                        )
+                        result.filename = filename
+                    except Exception as e:
+                        logger.error(f"Render job {job.job_id} failed for watch {watch_id}: {e}")
+                        result.error = "Render failed"
+                    job.results.append(result)
+                    job.done += 1
+                    await self._notify(job)
+                job.status = "done" if any(r.filename for r in job.results) else "failed"
+                if job.status == "failed":
+                    job.error = "No watch could be rendered"
+        except ImageDecodeError:
+            job.status = "failed"
+            job.error = "Could not decode image"
+        except Exception as e:
+            logger.error(f"Render job {job.job_id} failed: {e}", exc_info=True)
+            job.status = "failed"
+            job.error = "Render failed"
+        finally:
+            self._pending -= 1
+            self._tasks.pop(job.job_id, None)
+            metrics.RENDER_JOBS.inc(status=job.status)
+            await self._notify(job)
+
+    def shutdown(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache()
+def get_render_jobs() -> RenderJobs:
+    return RenderJobs(
+        JobStore(Path(settings.render_job_dir), settings.render_job_ttl_seconds, settings.render_job_max_bytes),
+        settings.render_job_workers,
+        settings.render_job_max_pending
+    )
+
+
+def job_response(job: JobState) -> dict:
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "progress": {"done": job.done, "total": len(job.watch_ids)},
+        "tier": job.tier,
+        "results": [
+            {
+                **r.model_dump(exclude={"filename"}),
+                "url": f"/api/jobs/{job.job_id}/results/{r.filename}" if r.filename else None
+            }
+            for r in job.results
+        ],
+        "error": job.error,
+        "expires_at": job.expires_at,
+    }
+
+
+@router.post("/render", status_code=status.HTTP_202_ACCEPTED)
+async def submit_render_job(
+    response: Response,
+    file: UploadFile = File(...),
+    watch_ids: str = Form("1", description="Comma-separated watch IDs"),
+    output_format: str = Form("png", description="png (lossless) or jpg"),
+    tier: Optional[str] = Form(None, description="Model tier: lite, full or full-2hands")
+):
+    """Queue a full-resolution render of one image with one or more watches"""
+    if not file.content_type or not file.content_type.startswith('image/'):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File must be an image")
+    if Path(file.filename or '').suffix.lower() not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type not allowed. Allowed: {ALLOWED_EXTENSIONS}"
+        )
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="output_format must be png or jpg")
+
+    ids = list(dict.fromkeys(w.strip() for w in watch_ids.split(",") if w.strip()))
+    if not ids or len(ids) > MAX_WATCHES_PER_JOB:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Provide between 1 and {MAX_WATCHES_PER_JOB} watch IDs"
+        )
+    check_watch_ids(ids)
+    try:
+        model_tier = get_tier(tier)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    try:
+        contents = await file.read()
+    finally:
+        await file.close()
+    if len(contents) > settings.max_upload_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File too large. Max size: {settings.max_upload_size / 1024 / 1024:.1f}MB"
+        )
+
+    job = await get_render_jobs().submit(contents, ids, output_format, model_tier)
+    logger.info(f"Queued render job {job.job_id} for watches {ids}")
+    response.headers["Location"] = f"/api/jobs/{job.job_id}"
+    return job_response(job)
+
+
+@router.get("/{job_id}")
+async def get_render_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=MAX_WAIT_SECONDS, description="Long-poll up to this many seconds for progress")
+):
+    """Job status and progress; with ?wait=N, returns early on the next change"""
+    job = await get_render_jobs().wait(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found or expired")
+    return job_response(job)
+
+
+@router.get("/{job_id}/results/{filename}")
+async def get_render_job_result(job_id: str, filename: str):
+    """Download one rendered image"""
+    job = await get_render_jobs().get(job_id)
+    if job is None or filename not in {r.filename for r in job.results if r.filename}:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Result not found")
+    media_type = "image/png" if job.output_format == "png" else "image/jpeg"
+    return FileResponse(get_render_jobs().store.output_path(job, filename), media_type=media_type)
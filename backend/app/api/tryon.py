@@ -3,10 +3,10 @@ import os
 import json
 import asyncio
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple, Union
 from functools import lru_cache
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, WebSocket, WebSocketDisconnect, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request, Response, status, WebSocket, WebSocketDisconnect, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, field_validator
 import cv2
 import numpy as np
@@ -14,8 +14,20 @@ from io import BytesIO
 import base64
 import time
 
+from app.cv.buffers import BufferPool
+from app.cv.frame_formats import RawFrameFormat
+from app.cv.gating import FrameGate
+from app.cv.roi import CropRect, ROIHinter, to_full_frame
+from app.cv.tracking import MotionTracker
 from app.cv.watch_tryon import WatchTryOn
+from app.core import metrics
 from app.core.config import get_settings
+from app.core.admission import CVOverloaded, Priority, get_cv_admission
+from app.core.landmark_codec import DEFAULT_FIELDS, LandmarkEncoder
+from app.core.quality import QualityController
+from app.core.recording import start_recording
+from app.core.sessions import SessionEnded, get_session_registry
+from app.core.tiers import ModelTier, TierGovernor, get_tier, governed_tier
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -41,6 +53,7 @@ class Watch(BaseModel):
 class ProcessFrameRequest(BaseModel):
     image: str
     watch_id: str = "default"
+    tier: Optional[str] = None  # lite, full or full-2hands
     
     @field_validator('image')
     @classmethod
@@ -53,6 +66,7 @@ class ProcessFrameRequest(BaseModel):
 class TryOnRequest(BaseModel):
     image: str
     watch_id: str = "1"
+    tier: Optional[str] = None  # lite, full or full-2hands
     
     @field_validator('image')
     @classmethod
@@ -140,9 +154,24 @@ WATCHES_DB = {
 @lru_cache(maxsize=10)
 def get_watch_tryon(watch_path: str) -> WatchTryOn:
     """Cache WatchTryOn instances to avoid reloading images"""
-    tryon = WatchTryOn(watch_path)
-    tryon.load_watch_image()
-    return tryon
+    return WatchTryOn(watch_path)
+
+
+def _collect_cache_metrics() -> None:
+    info = get_watch_tryon.cache_info()
+    metrics.CACHE_REQUESTS.set(info.hits, cache="watch_tryon", result="hit")
+    metrics.CACHE_REQUESTS.set(info.misses, cache="watch_tryon", result="miss")
+
+
+metrics.REGISTRY.register_collector(_collect_cache_metrics)
+
+
+class ImageDecodeError(ValueError):
+    """Raised when uploaded bytes are not a decodable image"""
+
+
+class ImageEncodeError(RuntimeError):
+    """Raised when the result frame cannot be encoded"""
 
 
 def validate_image_size(img: np.ndarray) -> np.ndarray:
@@ -152,7 +181,8 @@ def validate_image_size(img: np.ndarray) -> np.ndarray:
         scale = MAX_IMAGE_DIMENSION / max(h, w)
         new_w = int(w * scale)
         new_h = int(h * scale)
-        img = cv2.resize(img, (new_w, new_h))
+        with metrics.stage("resize"):
+            img = cv2.resize(img, (new_w, new_h))
         logger.info(f"Resized image from {w}x{h} to {new_w}x{new_h}")
     return img
 
@@ -172,17 +202,147 @@ def get_watch_image_path(watch_id: str) -> Path:
     return watch_path
 
 
+def run_tryon_pipeline(
+    image_data: bytes,
+    watch_path: str,
+    encode_ext: str = '.jpg',
+    tier: Optional[ModelTier] = None
+) -> dict:
+    """Decode, process and encode one try-on image.
+    
+    Blocking; runs on a CV worker thread via the admission controller.
+    
+    Returns:
+        Dict with the encoded 'buffer' and 'hands_detected'
+    """
+    with metrics.stage("imdecode"):
+        nparr = np.frombuffer(image_data, np.uint8)
+        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ImageDecodeError("Could not decode image")
+    
+    img = validate_image_size(img)
+    
+    tryon = get_watch_tryon(watch_path)
+    result = tryon.process_frame(img, tier=tier)
+    result_img = tryon.render(img, result) if result.get("hands_detected") else img
+    
+    params = [cv2.IMWRITE_JPEG_QUALITY, 85] if encode_ext == '.jpg' else []
+    with metrics.stage("encode"):
+        success, buffer = cv2.imencode(encode_ext, result_img, params)
+    if not success:
+        raise ImageEncodeError(f"Failed to encode result as {encode_ext}")
+    
+    return {
+        "buffer": buffer,
+        "hands_detected": result.get("hands_detected", False)
+    }
+
+
+# libjpeg scales by these factors in the DCT domain, far cheaper than a full
+# decode; other formats are decoded in full by the same flags, then resized
+REDUCED_DECODE_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+
+
+def decode_reduced(image_data: bytes, max_width: int) -> Optional[np.ndarray]:
+    """Decode to at most max_width pixels wide.
+    
+    JPEGs are probed at 1/8 scale, then decoded at the coarsest reduction
+    that still gives at least max_width pixels; other formats are decoded
+    once at full size. Either way the result is resized to max_width.
+    """
+    nparr = np.frombuffer(image_data, np.uint8)
+    if image_data[:3] == b'\xff\xd8\xff':
+        img = cv2.imdecode(nparr, REDUCED_DECODE_FLAGS[8])
+        if img is None:
+            return None
+        full_width = img.shape[1] * 8
+        factor = next((f for f in (8, 4, 2) if full_width / f >= max_width), 1)
+        if factor != 8:
+            img = cv2.imdecode(nparr, REDUCED_DECODE_FLAGS.get(factor, cv2.IMREAD_COLOR))
+    else:
+        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    if img is not None and img.shape[1] > max_width:
+        size = (max_width, round(img.shape[0] * max_width / img.shape[1]))
+        img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    return img
+
+
+def run_preview_pipeline(image_data: bytes, watch_path: str, max_width: int, quality: int) -> dict:
+    """Low-resolution try-on for progressive uploads: reduced decode, lite-tier
+    detection and a small JPEG, returned while the full render is queued.
+    
+    Returns:
+        Dict with the encoded 'buffer', 'hands_detected' and preview size
+    """
+    with metrics.stage("imdecode"):
+        img = decode_reduced(image_data, max_width)
+    if img is None:
+        raise ImageDecodeError("Could not decode image")
+    
+    tryon = get_watch_tryon(watch_path)
+    result = tryon.process_frame(img, tier=get_tier("lite"))
+    if result.get("hands_detected"):
+        img = tryon.render(img, result)
+    
+    with metrics.stage("encode"):
+        success, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not success:
+        raise ImageEncodeError("Failed to encode preview")
+    
+    return {
+        "buffer": buffer,
+        "hands_detected": result.get("hands_detected", False),
+        "width": img.shape[1],
+        "height": img.shape[0]
+    }
+
+
+def resolve_tier(name: Optional[str]) -> ModelTier:
+    """Requested model tier, downgraded while the CV workers are overloaded"""
+    try:
+        requested = get_tier(name)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return governed_tier(requested, get_cv_admission())
+
+
+def client_key(http_request: Request) -> str:
+    """Fairness key for an HTTP caller"""
+    host = http_request.client.host if http_request.client else "unknown"
+    return f"http:{host}"
+
+
+async def run_cv_or_503(fn, *args, key: str, priority: Priority = Priority.STANDARD):
+    """Run CV work under admission control, shedding with 503 + Retry-After"""
+    try:
+        return await get_cv_admission().run(fn, *args, key=key, priority=priority)
+    except CVOverloaded as e:
+        logger.warning(f"Shedding try-on request: {e.reason}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Try-on service is busy, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
 @router.post("/try-on", response_model=TryOnResponse)
-async def try_on(request: TryOnRequest):
+async def try_on(request: TryOnRequest, http_request: Request, response: Response):
     """Try on a watch with base64-encoded image"""
     
+    timings = metrics.collect_timings()
     try:
         # Decode base64 image safely
         try:
-            if request.image.startswith('data:image'):
-                image_data = base64.b64decode(request.image.split(',')[1])
-            else:
-                image_data = base64.b64decode(request.image)
+            with metrics.stage("b64decode"):
+                if request.image.startswith('data:image'):
+                    image_data = base64.b64decode(request.image.split(',')[1])
+                else:
+                    image_data = base64.b64decode(request.image)
         except Exception as e:
             return TryOnResponse(
                 success=False,
@@ -198,27 +358,6 @@ async def try_on(request: TryOnRequest):
                 error=f"Image too large. Max size: {settings.max_upload_size / 1024 / 1024:.1f}MB"
             )
         
-        # Decode to NumPy frame
-        try:
-            nparr = np.frombuffer(image_data, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if img is None:
-                return TryOnResponse(
-                    success=False,
-                    data=None,
-                    error="Could not decode image. Please provide a valid image."
-                )
-        except Exception as e:
-            return TryOnResponse(
-                success=False,
-                data=None,
-                error="Failed to process image data"
-            )
-        
-        # Validate and resize if needed
-        img = validate_image_size(img)
-        
         # Get watch image path
         watch_path = get_watch_image_path(request.watch_id)
         if not watch_path.exists():
@@ -228,35 +367,29 @@ async def try_on(request: TryOnRequest):
                 error=f"Watch not found: {request.watch_id}"
             )
         
-        # Process with WatchTryOn
+        tier = resolve_tier(request.tier)
+        response.headers["X-Model-Tier"] = tier.name
+        
+        # Decode, process with WatchTryOn and encode on a CV worker
         try:
-            tryon = get_watch_tryon(str(watch_path))
-            result = tryon.process_frame(img)
-            
-            result_img = result["image"]
-            hands_detected = result.get("hands_detected", False)
-            
-            # Encode result to base64
-            success_encode, buffer = cv2.imencode('.jpg', result_img, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            if not success_encode:
-                return TryOnResponse(
-                    success=False,
-                    data=None,
-                    error="Failed to encode result image"
-                )
-            
-            img_base64 = base64.b64encode(buffer).decode('utf-8')
-            
+            result = await run_cv_or_503(
+                run_tryon_pipeline, image_data, str(watch_path), '.jpg', tier,
+                key=client_key(http_request)
+            )
+        except ImageDecodeError:
             return TryOnResponse(
-                success=True,
-                data={
-                    "image": f"data:image/jpeg;base64,{img_base64}",
-                    "watch_id": request.watch_id,
-                    "hands_detected": hands_detected
-                },
-                error=None
+                success=False,
+                data=None,
+                error="Could not decode image. Please provide a valid image."
             )
-            
+        except ImageEncodeError:
+            return TryOnResponse(
+                success=False,
+                data=None,
+                error="Failed to encode result image"
+            )
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error in watch processing: {str(e)}", exc_info=True)
             return TryOnResponse(
@@ -264,7 +397,22 @@ async def try_on(request: TryOnRequest):
                 data=None,
                 error="Failed to process watch overlay"
             )
+        
+        img_base64 = base64.b64encode(result["buffer"]).decode('utf-8')
+        response.headers["Server-Timing"] = metrics.server_timing_header(timings)
+        
+        return TryOnResponse(
+            success=True,
+            data={
+                "image": f"data:image/jpeg;base64,{img_base64}",
+                "watch_id": request.watch_id,
+                "hands_detected": result["hands_detected"]
+            },
+            error=None
+        )
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Unexpected error in try-on: {str(e)}", exc_info=True)
         return TryOnResponse(
@@ -276,11 +424,22 @@ async def try_on(request: TryOnRequest):
 
 @router.post("/upload-image")
 async def upload_image(
+    http_request: Request,
     file: UploadFile = File(...),
-    watch_id: str = "1"
+    watch_id: str = "1",
+    tier: Optional[str] = Query(None, description="Model tier: lite, full or full-2hands"),
+    progressive: bool = Query(False, description="Return a quick preview and a render job for the full result")
 ):
-    """Upload an image and get watch try-on result"""
+    """Upload an image and get watch try-on result
     
+    With ?progressive=true the response is JSON instead of a PNG: a
+    low-resolution preview composite (data URL) plus the render job that
+    produces the full-resolution result. Poll or long-poll the job's
+    status_url, or send {"type": "render_job", "job_id": ...} on the try-on
+    WebSocket to have its progress pushed.
+    """
+    
+    timings = metrics.collect_timings()
     if not file.content_type or not file.content_type.startswith('image/'):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -303,17 +462,6 @@ async def upload_image(
                 detail=f"File too large. Max size: {settings.max_upload_size / 1024 / 1024:.1f}MB"
             )
         
-        nparr = np.frombuffer(contents, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if img is None:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Could not decode image"
-            )
-        
-        img = validate_image_size(img)
-        
         watch_path = get_watch_image_path(watch_id)
         if not watch_path.exists():
             raise HTTPException(
@@ -321,25 +469,40 @@ async def upload_image(
                 detail="Watch image not found"
             )
         
-        tryon = get_watch_tryon(str(watch_path))
-        result_img = tryon.process_frame(img)
+        model_tier = resolve_tier(tier)
         
-        success, buffer = cv2.imencode('.png', result_img)
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to encode result"
-            )
+        if progressive:
+            return await progressive_upload(http_request, contents, watch_id, watch_path, model_tier, timings)
         
-        io_buf = BytesIO(buffer)
+        # Full-resolution PNG renders are bulk work behind live sessions
+        result = await run_cv_or_503(
+            run_tryon_pipeline, contents, str(watch_path), '.png', model_tier,
+            key=client_key(http_request), priority=Priority.BULK
+        )
+        
+        io_buf = BytesIO(result["buffer"])
         logger.info(f"Processed upload for watch_id: {watch_id}")
         
         return StreamingResponse(
             io_buf,
             media_type="image/png",
-            headers={"X-Watch-ID": watch_id}
+            headers={
+                "X-Watch-ID": watch_id,
+                "X-Model-Tier": model_tier.name,
+                "Server-Timing": metrics.server_timing_header(timings)
+            }
         )
     
+    except ImageDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Could not decode image"
+        )
+    except ImageEncodeError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to encode result"
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -352,12 +515,56 @@ async def upload_image(
         await file.close()
 
 
+async def progressive_upload(
+    http_request: Request,
+    contents: bytes,
+    watch_id: str,
+    watch_path: Path,
+    model_tier: ModelTier,
+    timings
+) -> JSONResponse:
+    """Make a preview, then queue the full render and answer with both"""
+    from app.api.jobs import check_watch_ids, get_render_jobs
+    
+    check_watch_ids([watch_id])
+    # Preview first: if it is shed, the client's retry must not leave an orphan job behind
+    preview = await run_cv_or_503(
+        run_preview_pipeline, contents, str(watch_path),
+        settings.upload_preview_max_width, settings.upload_preview_jpeg_quality,
+        key=client_key(http_request)
+    )
+    job = await get_render_jobs().submit(contents, [watch_id], "png", model_tier)
+    logger.info(f"Sent upload preview for watch_id: {watch_id}, full render job {job.job_id}")
+    return JSONResponse(
+        content={
+            "success": True,
+            "data": {
+                "preview": "data:image/jpeg;base64," + base64.b64encode(preview["buffer"]).decode('utf-8'),
+                "width": preview["width"],
+                "height": preview["height"],
+                "watch_id": watch_id,
+                "hands_detected": preview["hands_detected"],
+                "job_id": job.job_id,
+                "status_url": f"/api/jobs/{job.job_id}"
+            },
+            "error": None
+        },
+        headers={
+            "X-Watch-ID": watch_id,
+            "X-Model-Tier": model_tier.name,
+            "Server-Timing": metrics.server_timing_header(timings)
+        }
+    )
+
+
 @router.post("/process-frame")
-async def process_frame(request: ProcessFrameRequest):
+async def process_frame(request: ProcessFrameRequest, http_request: Request, response: Response):
     """Process a webcam frame with watch overlay"""
     
+    timings = metrics.collect_timings()
     try:
-        image_data = base64.b64decode(request.image.split(',')[1])
+        with metrics.stage("b64decode"):
+            image_data = base64.b64decode(request.image.split(',')[1])
         
         if len(image_data) > settings.max_upload_size:
             raise HTTPException(
@@ -365,17 +572,6 @@ async def process_frame(request: ProcessFrameRequest):
                 detail="Frame too large"
             )
         
-        nparr = np.frombuffer(image_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if img is None:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid image data"
-            )
-        
-        img = validate_image_size(img)
-        
         watch_path = get_watch_image_path(request.watch_id)
         if not watch_path.exists():
             raise HTTPException(
@@ -383,27 +579,33 @@ async def process_frame(request: ProcessFrameRequest):
                 detail="Watch not found"
             )
         
-        tryon = get_watch_tryon(str(watch_path))
-        result = tryon.process_frame(img)
-        
-        result_img = result["image"]
-        hands_detected = result.get("hands_detected", False)
+        tier = resolve_tier(request.tier)
+        response.headers["X-Model-Tier"] = tier.name
         
-        success, buffer = cv2.imencode('.jpg', result_img, [cv2.IMWRITE_JPEG_QUALITY, 85])
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to encode frame"
-            )
+        result = await run_cv_or_503(
+            run_tryon_pipeline, image_data, str(watch_path), '.jpg', tier,
+            key=client_key(http_request)
+        )
         
-        img_base64 = base64.b64encode(buffer).decode('utf-8')
+        img_base64 = base64.b64encode(result["buffer"]).decode('utf-8')
+        response.headers["Server-Timing"] = metrics.server_timing_header(timings)
         
         return {
             "image": f"data:image/jpeg;base64,{img_base64}",
             "watch_id": request.watch_id,
-            "hands_detected": hands_detected
+            "hands_detected": result["hands_detected"]
         }
     
+    except ImageDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid image data"
+        )
+    except ImageEncodeError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to encode frame"
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -438,59 +640,280 @@ async def get_watch(watch_id: str):
 
 # ============== WEBSOCKET ENDPOINT ==============
 
+def process_ws_frame(
+    frame_data: Union[str, bytes],
+    watch_path: Optional[str],
+    gate: Optional[FrameGate] = None,
+    raw_format: Optional[RawFrameFormat] = None,
+    crop: Optional[CropRect] = None,
+    roi: Optional[ROIHinter] = None,
+    buffers: Optional[BufferPool] = None,
+    tier: Optional[ModelTier] = None
+) -> Tuple[Optional[dict], bool]:
+    """Decode a WebSocket frame and detect landmarks
+    
+    Text frames carry a base64 encoded image; binary frames carry raw pixels
+    in the session's negotiated raw_format and skip the image codec.
+    With a gate, near-identical frames of the same crop reuse the session's
+    previous landmarks.
+    Landmarks stay relative to the frame as sent, even if it is a crop.
+    Raw frames are converted into the session's reused buffers.
+    
+    Returns:
+        (result, reused): result is None if the frame is undecodable; reused
+        is True when the gate returned the previous landmarks
+    """
+    if watch_path is None:
+        raise ValueError("No watch image available")
+    
+    if isinstance(frame_data, bytes):
+        frame = raw_format.to_bgr(frame_data, buffers)
+    else:
+        if 'base64,' in frame_data:
+            frame_data = frame_data.split('base64,')[1]
+        
+        with metrics.stage("b64decode"):
+            img_bytes = base64.b64decode(frame_data)
+        with metrics.stage("imdecode"):
+            nparr = np.frombuffer(img_bytes, np.uint8)
+            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        if frame is None:
+            return None, False
+    
+    if roi is not None:
+        roi.observe_frame(frame.shape[1], frame.shape[0], crop)
+    
+    if gate is not None and not gate.should_detect(frame, crop):
+        return gate.last_result, True
+    
+    result = get_watch_tryon(watch_path).process_frame(frame, buffers, tier)
+    if gate is not None:
+        gate.last_result = result
+    return result, False
+
+
+MAX_JOB_WATCHERS = 4  # render jobs one WebSocket session may follow
+
+
+async def push_render_job(websocket: WebSocket, job_id: str) -> None:
+    """Send a render job's state over a try-on WebSocket each time it changes, until it is final"""
+    from app.api.jobs import get_render_jobs, job_response
+    
+    jobs = get_render_jobs()
+    sent = None
+    while True:
+        job = await jobs.wait(job_id, 30)
+        if job is None:
+            await websocket.send_text(json.dumps({"type": "render_job", "job_id": job_id, "status": "not_found"}))
+            return
+        state = (job.status, job.done)
+        if state != sent:
+            await websocket.send_text(json.dumps({"type": "render_job", **job_response(job)}))
+            sent = state
+        elif not job.final:
+            # Not tracked by this process (e.g. queued before a restart); poll instead
+            await asyncio.sleep(1.0)
+        if job.final:
+            return
+
+
+def timed_call(fn, *args):
+    """Call fn, returning (result, started, finished) perf_counter stamps"""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, started, time.perf_counter()
+
+
 @router.websocket("/ws")
-async def websocket_tryon_endpoint(websocket: WebSocket):
+async def websocket_tryon_endpoint(
+    websocket: WebSocket,
+    timings: bool = Query(False, description="Include a per-frame stage breakdown in replies")
+):
     """
     WebSocket endpoint for real-time AR try-on
     
     Client sends: {"type": "frame", "image": "<base64>", "watch_id": 1}
-    Server responds: {"type": "landmarks", "landmarks": {...}, "fps": 15} or {"type": "no_hands"}
+    Server responds: {"type": "landmarks", "landmarks": {...}, "hands": [{...}, ...], "fps": 15}
+    or {"type": "no_hands"}; "landmarks" is the first of "hands"
+    When the CV workers are saturated the frame is dropped: {"type": "busy", "retry_after_ms": 1000}
+    
+    The server also sends {"type": "quality", "max_width": 640, "jpeg_quality": 70,
+    "frame_interval_ms": 50, ...} on connect and whenever the session's target
+    capture settings change to hold the latency SLO.
+    
+    With ?timings=true, landmarks/no_hands replies carry
+    "timings": {"queue": ms, "decode": ms, "detect": ms, "render": ms, "encode": ms}.
+    
+    Under CV load the detector runs only every Nth frame; landmarks for the
+    frames in between are extrapolated from past detections and marked
+    "predicted": true.
+    
+    Clients may negotiate compact binary landmark replies (see
+    app.core.landmark_codec) by sending
+    {"type": "hello", "landmarks": "binary", "fields": ["wrist_x", "wrist_y", ...]};
+    the server answers with a hello describing the layout, after which
+    landmarks/no_hands replies are binary frames without fps or timings.
+    
+    The same hello may negotiate raw frames, e.g.
+    "frames": {"format": "nv12", "width": 320, "height": 240} (gray, rgba,
+    nv12 or i420). The client then sends each frame as a binary message of
+    exactly that layout, and selects the watch with {"type": "watch", "watch_id": 1}.
+    
+    With "roi": true in the hello, replies carry "roi": {"x", "y", "w", "h"},
+    a suggested crop normalized to the full frame, or null to request a
+    full frame. Text frames may then send only that crop with
+    "crop": {"x", "y", "w", "h"}; landmarks are always returned in
+    full-frame coordinates. With binary landmarks the hint arrives as a
+    separate {"type": "roi", "roi": ...} message whenever it changes.
+    
+    "tier" in the hello picks the model tier (lite, full, full-2hands). Under
+    load, once quality is at its lowest level, the session moves to cheaper
+    tiers and back, announced with
+    {"type": "tier", "tier": "lite", "requested": "full", "reason": "load"}.
+    
+    While the client is quiet the server sends {"type": "heartbeat"}; any
+    client message (e.g. {"type": "pong"}) keeps the session alive, which is
+    closed with 1001 after ws_idle_timeout_seconds of silence. Past the
+    per-process session cap, connections get a busy message and 1013.
+    
+    {"type": "render_job", "job_id": "..."} follows a render job (e.g. the
+    full result of a progressive upload): the server pushes
+    {"type": "render_job", "status": ..., "progress": {...}, "results": [...]}
+    on every change until it is done or failed, alongside live frames.
     """
-    await websocket.accept()
+    registry = get_session_registry()
+    session = await registry.admit(websocket, "/api/tryon/ws")
+    if session is None:
+        return
     logger.info("WebSocket connected")
     
     frame_count = 0
     fps = 0.0
     last_fps_time = time.time()
     current_watch_id = "1"
-    tryon = None
+    watch_path = None
+    admission = get_cv_admission()
+    session_key = session.key
+    quality = QualityController(settings.tryon_latency_slo_ms, admission)
+    recorder = start_recording(
+        settings.tryon_record_dir, "/api/tryon/ws", settings.tryon_record_max_frames
+    )
+    recorded_watch_id = None
+    gate = FrameGate(settings.tryon_gate_threshold, settings.tryon_gate_refresh_frames)
+    tracker = MotionTracker(settings.tryon_predict_max_interval, settings.tryon_predict_error_budget)
+    encoder: Optional[LandmarkEncoder] = None
+    raw_format: Optional[RawFrameFormat] = None
+    selected_watch_id = "1"
+    roi: Optional[ROIHinter] = None
+    sent_roi = None
+    buffers = BufferPool()
+    tiers = TierGovernor(
+        get_tier(), settings.tryon_latency_slo_ms, admission, quality,
+        settings.tryon_tier_downgrade_load, settings.tryon_tier_upgrade_load
+    )
+    job_watchers: Dict[str, asyncio.Task] = {}
+    session.on_release(buffers.clear)
+    if recorder is not None:
+        session.on_release(recorder.close)
+    session.on_release(lambda: [task.cancel() for task in job_watchers.values()])
     
     try:
+        await websocket.send_text(json.dumps(quality.control_message("initial")))
+        
         while True:
-            # Receive message from client
-            data = await websocket.receive_text()
-            message = json.loads(data)
+            # Receive message from client: JSON text, or raw pixels as binary
+            received = await session.receive()
+            if received["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(received.get("code", 1000))
+            if received.get("bytes") is not None:
+                if raw_format is None:
+                    await websocket.send_text(json.dumps({
+                        "type": "error",
+                        "message": "Binary frames need a raw format negotiated with hello"
+                    }))
+                    continue
+                message = {"type": "frame"}
+                frame_data = received["bytes"]
+            else:
+                message = json.loads(received["text"])
+                frame_data = message.get("image", "")
             
             if message.get("type") == "frame":
                 try:
-                    # Decode base64 frame
-                    frame_data = message.get("image", "")
-                    new_watch_id = str(message.get("watch_id", "1"))
+                    if "watch_id" in message:
+                        selected_watch_id = str(message["watch_id"])
+                    new_watch_id = selected_watch_id
+                    crop = None
+                    if roi is not None and isinstance(message.get("crop"), dict):
+                        crop = CropRect(**message["crop"])
+                    
+                    # Raw frames are not recorded: replay expects encoded images
+                    if recorder is not None and isinstance(frame_data, str):
+                        if new_watch_id != recorded_watch_id:
+                            recorder.event("watch", watch_id=new_watch_id)
+                            recorded_watch_id = new_watch_id
+                        recorder.frame_b64(frame_data)
                     
-                    # Load tryon instance if watch changed
-                    if new_watch_id != current_watch_id or tryon is None:
-                        watch_path = get_watch_image_path(new_watch_id)
-                        if watch_path.exists():
-                            tryon = get_watch_tryon(str(watch_path))
+                    # Resolve watch image if watch changed
+                    if new_watch_id != current_watch_id or watch_path is None:
+                        candidate = get_watch_image_path(new_watch_id)
+                        if candidate.exists():
+                            watch_path = str(candidate)
                             current_watch_id = new_watch_id
                     
-                    if 'base64,' in frame_data:
-                        frame_data = frame_data.split('base64,')[1]
+                    frame_timings = metrics.collect_timings() if timings else None
+                    submitted = time.perf_counter()
+                    tracker.adapt(admission.pressure())
+                    predicted = watch_path is not None and not tracker.should_detect()
+                    if roi is not None and crop is None and roi.wants_full_frame:
+                        predicted = False  # the requested full frame is always searched
+                    change = None
                     
-                    img_bytes = base64.b64decode(frame_data)
-                    nparr = np.frombuffer(img_bytes, np.uint8)
-                    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+                    if predicted:
+                        # Between detections: extrapolate, no decode or CV worker needed
+                        hands = tracker.predict(submitted)
+                        result = {"hands_detected": True, "landmarks": hands[0], "hands": hands}
+                    else:
+                        # Decode and detect on a CV worker, dropping the frame if saturated
+                        try:
+                            frame_job = asyncio.ensure_future(admission.run(
+                                timed_call, process_ws_frame, frame_data, watch_path, gate, raw_format,
+                                crop, roi, buffers, tiers.tier, key=session_key, priority=Priority.INTERACTIVE
+                            ))
+                            # If the session is reaped mid-frame, its buffers are freed after the worker is done
+                            session.hold(frame_job)
+                            (result, reused), started, finished = await asyncio.shield(frame_job)
+                        except CVOverloaded as e:
+                            await websocket.send_text(json.dumps({
+                                "type": "busy",
+                                "retry_after_ms": e.retry_after * 1000
+                            }))
+                            change = quality.shed()
+                            if change is not None:
+                                await websocket.send_text(json.dumps(quality.control_message("load")))
+                            continue
+                        
+                        change = quality.observe(
+                            (started - submitted) * 1000,
+                            (finished - started) * 1000
+                        )
+                        tier_change = tiers.observe((finished - submitted) * 1000)
+                        if tier_change is not None:
+                            await websocket.send_text(json.dumps(tiers.control_message("load")))
+                        if result is not None and crop is not None and result.get("hands_detected"):
+                            hands = [to_full_frame(h, crop) for h in result.get("hands") or [result["landmarks"]]]
+                            result = {**result, "landmarks": hands[0], "hands": hands}
+                        # Reused landmarks are not a new measurement of the hand
+                        if result is not None and not reused:
+                            tracker.observe(result, submitted)
                     
-                    if frame is None:
+                    if result is None:
                         await websocket.send_text(json.dumps({
                             "type": "error",
                             "message": "Failed to decode frame"
                         }))
                         continue
                     
-                    # Process frame to get landmarks
-                    result = tryon.process_frame(frame)
-                    
                     # Calculate FPS
                     frame_count += 1
                     if frame_count % 30 == 0:
@@ -500,17 +923,36 @@ async def websocket_tryon_endpoint(websocket: WebSocket):
                             fps = 30 / elapsed
                         last_fps_time = current_time
                     
+                    if roi is not None:
+                        roi.observe(result, crop)
+                    
                     # Send landmarks or no_hands response
-                    if result.get("hands_detected"):
-                        await websocket.send_text(json.dumps({
-                            "type": "landmarks",
-                            "landmarks": result["landmarks"],
-                            "fps": round(fps, 1)
-                        }))
+                    if encoder is not None:
+                        hands = (result.get("hands") or [result["landmarks"]]) if result.get("hands_detected") else []
+                        await websocket.send_bytes(encoder.encode(hands, predicted))
+                        if roi is not None and roi.suggest() != sent_roi:
+                            sent_roi = roi.suggest()
+                            await websocket.send_text(json.dumps({"type": "roi", "roi": sent_roi}))
                     else:
-                        await websocket.send_text(json.dumps({
-                            "type": "no_hands"
-                        }))
+                        if result.get("hands_detected"):
+                            reply = {
+                                "type": "landmarks",
+                                "landmarks": result["landmarks"],
+                                "hands": result.get("hands") or [result["landmarks"]],
+                                "fps": round(fps, 1)
+                            }
+                            if predicted:
+                                reply["predicted"] = True
+                        else:
+                            reply = {"type": "no_hands"}
+                        if roi is not None:
+                            reply["roi"] = roi.suggest()
+                        if frame_timings is not None:
+                            reply["timings"] = metrics.timings_ms(frame_timings)
+                        await websocket.send_text(json.dumps(reply))
+                    
+                    if change is not None:
+                        await websocket.send_text(json.dumps(quality.control_message("latency")))
                     
                 except Exception as e:
                     logger.error(f"Frame processing error: {e}")
@@ -519,16 +961,66 @@ async def websocket_tryon_endpoint(websocket: WebSocket):
                         "message": str(e)
                     }))
             
+            elif message.get("type") == "hello":
+                try:
+                    new_encoder = None
+                    if message.get("landmarks") == "binary":
+                        new_encoder = LandmarkEncoder(message.get("fields") or DEFAULT_FIELDS)
+                    frames = message.get("frames")
+                    new_format = RawFrameFormat(**frames) if isinstance(frames, dict) else None
+                    new_tier = get_tier(message["tier"]) if message.get("tier") else None
+                except (ValueError, TypeError) as e:
+                    await websocket.send_text(json.dumps({"type": "error", "message": str(e)}))
+                    continue
+                encoder, raw_format = new_encoder, new_format
+                if new_tier is not None:
+                    tiers.request(new_tier)
+                roi = ROIHinter(settings.tryon_roi_scale, settings.tryon_roi_full_frame_every) \
+                    if message.get("roi") else None
+                sent_roi = None
+                if "watch_id" in message:
+                    selected_watch_id = str(message["watch_id"])
+                gate.reset()
+                
+                reply = {
+                    "type": "hello",
+                    "landmarks": "binary" if encoder is not None else "json",
+                    "frames": raw_format.model_dump() if raw_format is not None else "encoded",
+                    "roi": roi is not None,
+                    "tier": tiers.tier.name
+                }
+                if encoder is not None:
+                    reply.update(encoder.describe())
+                await websocket.send_text(json.dumps(reply))
+            
+            elif message.get("type") == "watch":
+                selected_watch_id = str(message.get("watch_id", selected_watch_id))
+            
+            elif message.get("type") == "render_job":
+                job_id = str(message.get("job_id", ""))
+                for done_id in [j for j, task in job_watchers.items() if task.done()]:
+                    del job_watchers[done_id]
+                if job_id in job_watchers:
+                    continue
+                if len(job_watchers) >= MAX_JOB_WATCHERS:
+                    await websocket.send_text(json.dumps({
+                        "type": "error",
+                        "message": f"At most {MAX_JOB_WATCHERS} render jobs per session"
+                    }))
+                    continue
+                job_watchers[job_id] = asyncio.create_task(push_render_job(websocket, job_id))
+            
             elif message.get("type") == "ping":
                 await websocket.send_text(json.dumps({"type": "pong"}))
     
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
+    except SessionEnded as e:
+        session.close_reason = e.reason
+        logger.info(f"Closing WebSocket: {e}")
     except Exception as e:
+        session.close_reason = "error"
         logger.error(f"WebSocket error: {e}")
     finally:
-        try:
-            await websocket.close()
-        except:
-            pass
+        await registry.release(session)
 
@@ -0,0 +1,316 @@
+"""
+Admission control and fair scheduling for CV work
+Bounds concurrent try-on processing, shares it fairly across sessions
+and sheds load instead of queueing forever
+"""
+import asyncio
+import contextvars
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
+from functools import lru_cache, partial
+from typing import Any, Callable, Deque, Dict, Optional
+
+from app.core import metrics, profiling
+from app.core.config import get_settings
+from app.core.runtime import get_runtime_plan
+
+logger = logging.getLogger(__name__)
+
+SHED_RATE_WINDOW = 60.0  # seconds
+
+
+class Priority(IntEnum):
+    """Scheduling class of a CV job"""
+    INTERACTIVE = 0  # live WebSocket frames
+    STANDARD = 1     # single HTTP try-on calls
+    BULK = 2         # uploads, batch and video jobs
+
+
+# Share of freed slots each backlogged class receives
+CLASS_WEIGHTS = {
+    Priority.INTERACTIVE: 6.0,
+    Priority.STANDARD: 3.0,
+    Priority.BULK: 1.0,
+}
+
+
+class CVOverloaded(Exception):
+    """Raised when a CV job is rejected because the service is saturated"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"CV service overloaded ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CVAdmission:
+    """Global CV concurrency limiter with a bounded, fair wait queue.
+
+    At most `max_concurrency` jobs run at once on a dedicated thread pool,
+    at most `max_queue` jobs wait for a slot (`max_per_key` per caller),
+    and a waiting job gives up after `queue_timeout` seconds.
+
+    Freed slots go to priority classes by weighted fair queueing, and
+    round-robin across caller keys (session or client) within a class, so
+    a chatty client cannot starve a slow one.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        max_per_key: int = 2
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.max_per_key = max(1, max_per_key)
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="cv-worker"
+        )
+        self._in_flight = 0
+        self._queued = 0
+        self._queues: Dict[Priority, "OrderedDict[str, Deque[asyncio.Future]]"] = {
+            p: OrderedDict() for p in Priority
+        }
+        self._vtime: Dict[Priority, float] = {p: 0.0 for p in Priority}
+        self._vclock = 0.0
+        self._service_time = 0.05  # EWMA of job duration, seconds
+        self._shed_times: Deque[float] = deque()
+        self.admitted_total = 0
+        self.completed_total = 0
+        self.shed_total = {"queue_full": 0, "deadline": 0, "draining": 0}
+        self.draining = False
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def pressure(self) -> float:
+        """Waiting jobs per worker, clipped to 0..1 (0 = workers keeping up)"""
+        return min(1.0, self._queued / self.max_concurrency)
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait, from queue depth and service time"""
+        backlog = (self.queue_depth + self._in_flight) / self.max_concurrency
+        return max(1, math.ceil(backlog * self._service_time))
+
+    def _shed(self, reason: str) -> CVOverloaded:
+        now = time.monotonic()
+        self.shed_total[reason] += 1
+        self._shed_times.append(now)
+        self._prune_shed_times(now)
+        return CVOverloaded(reason, self.retry_after())
+
+    async def _acquire(self, key: str, priority: Priority, timeout: float) -> None:
+        if self._in_flight < self.max_concurrency and not self._queued:
+            self._in_flight += 1
+            return
+
+        if self._queued >= self.max_queue:
+            raise self._shed("queue_full")
+
+        class_queue = self._queues[priority]
+        key_queue = class_queue.get(key)
+        if key_queue is not None and len(key_queue) >= self.max_per_key:
+            raise self._shed("queue_full")
+
+        if not class_queue:
+            # A class that was idle does not bank credit while idle
+            self._vtime[priority] = max(self._vtime[priority], self._vclock)
+        if key_queue is None:
+            key_queue = class_queue[key] = deque()
+
+        waiter = asyncio.get_running_loop().create_future()
+        key_queue.append(waiter)
+        self._queued += 1
+        try:
+            await asyncio.wait({waiter}, timeout=timeout)
+        except asyncio.CancelledError:
+            # Cancelled just after _release handed this waiter a slot: pass it on
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+                self._dequeue(priority, key, waiter)
+
+        if waiter.cancelled():
+            raise self._shed("deadline")
+        # Slot was handed over by _release; in_flight already accounts for it
+
+    def _dequeue(self, priority: Priority, key: str, waiter: asyncio.Future) -> None:
+        class_queue = self._queues[priority]
+        key_queue = class_queue.get(key)
+        if key_queue is None:
+            return
+        try:
+            key_queue.remove(waiter)
+            self._queued -= 1
+        except ValueError:
+            return
+        if not key_queue:
+            del class_queue[key]
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        """Pick the next waiter: lowest virtual time class, then round-robin by key"""
+        while self._queued:
+            backlogged = [p for p in Priority if self._queues[p]]
+            priority = min(backlogged, key=lambda p: (self._vtime[p], p))
+            class_queue = self._queues[priority]
+
+            key, key_queue = next(iter(class_queue.items()))
+            waiter = key_queue.popleft()
+            self._queued -= 1
+            if key_queue:
+                class_queue.move_to_end(key)
+            else:
+                del class_queue[key]
+
+            if waiter.done():
+                continue
+            self._vclock = self._vtime[priority]
+            self._vtime[priority] += 1.0 / CLASS_WEIGHTS[priority]
+            return waiter
+        return None
+
+    def _release(self) -> None:
+        waiter = self._next_waiter()
+        if waiter is not None:
+            waiter.set_result(None)
+        else:
+            self._in_flight -= 1
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        key: str = "anonymous",
+        priority: Priority = Priority.STANDARD,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """Run a blocking CV function on the worker pool once a slot is free.
+
+        Args:
+            key: Fairness key, e.g. a WebSocket session or client address
+            priority: Scheduling class of the job
+
+        Raises:
+            CVOverloaded: if the wait queue is full or the deadline passes
+        """
+        if self.draining:
+            raise self._shed("draining")
+        submitted = time.perf_counter()
+        await self._acquire(key, priority, self.queue_timeout if timeout is None else timeout)
+        waited = time.perf_counter() - submitted
+        metrics.STAGE_SECONDS.observe(waited, stage="queue")
+        metrics.record_timing("queue", waited)
+        self.admitted_total += 1
+        started = time.monotonic()
+        
+        def finished(_future: asyncio.Future) -> None:
+            elapsed = time.monotonic() - started
+            self._service_time = 0.9 * self._service_time + 0.1 * elapsed
+            self.completed_total += 1
+            self._release()
+        
+        try:
+            job = partial(fn, *args)
+            profile = profiling.current_request_profile()
+            if profile is not None and not profile.captured:
+                job = partial(profile.run, job)
+            # Run in a copy of the caller's context so per-request timings follow the job
+            context = contextvars.copy_context()
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, context.run, job)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is freed when the worker finishes, not when the caller is
+        # cancelled, so a cancelled session cannot push past max_concurrency
+        future.add_done_callback(finished)
+        return await asyncio.shield(future)
+
+    async def drain(self, timeout: float) -> bool:
+        """Stop admitting jobs and wait up to `timeout` for running and queued ones.
+        
+        Returns:
+            True if the workers went idle before the deadline
+        """
+        self.draining = True
+        deadline = time.monotonic() + timeout
+        while (self._in_flight or self._queued) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._in_flight or self._queued:
+            logger.warning(f"CV drain deadline passed with {self._in_flight} running, {self._queued} queued")
+            return False
+        return True
+
+    def shutdown(self) -> None:
+        """Stop the worker pool without waiting for jobs past the drain deadline"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _prune_shed_times(self, now: float) -> None:
+        """Drop sheds older than the rate window, so a flood of rejects cannot grow the deque unbounded"""
+        cutoff = now - SHED_RATE_WINDOW
+        while self._shed_times and self._shed_times[0] < cutoff:
+            self._shed_times.popleft()
+
+    def shed_rate(self) -> float:
+        """Rejected jobs per second over the last minute"""
+        self._prune_shed_times(time.monotonic())
+        return len(self._shed_times) / SHED_RATE_WINDOW
+
+    def snapshot(self) -> dict:
+        """Current limiter state for health and metrics endpoints"""
+        return {
+            "in_flight": self._in_flight,
+            "capacity": self.max_concurrency,
+            "queue_depth": self.queue_depth,
+            "queue_depth_by_class": {
+                p.name.lower(): sum(len(q) for q in self._queues[p].values())
+                for p in Priority
+            },
+            "max_queue": self.max_queue,
+            "admitted_total": self.admitted_total,
+            "completed_total": self.completed_total,
+            "shed_total": dict(self.shed_total),
+            "shed_rate": round(self.shed_rate(), 3),
+            "avg_service_ms": round(self._service_time * 1000, 1),
+            "draining": self.draining,
+        }
+
+    def export_metrics(self) -> None:
+        """Scrape-time collector for worker utilization, queue depth and shedding"""
+        metrics.CV_WORKERS.set(self._in_flight, state="busy")
+        metrics.CV_WORKERS.set(self.max_concurrency, state="capacity")
+        for p in Priority:
+            depth = sum(len(q) for q in self._queues[p].values())
+            metrics.CV_QUEUE_DEPTH.set(depth, priority=p.name.lower())
+        metrics.CV_JOBS.set(self.admitted_total, outcome="admitted")
+        for reason, count in self.shed_total.items():
+            metrics.CV_JOBS.set(count, outcome=f"shed_{reason}")
+
+
+@lru_cache()
+def get_cv_admission() -> CVAdmission:
+    settings = get_settings()
+    admission = CVAdmission(
+        max_concurrency=get_runtime_plan().cv_workers,
+        max_queue=settings.cv_max_queue,
+        queue_timeout=settings.cv_queue_timeout_ms / 1000,
+        max_per_key=settings.cv_max_queue_per_session
+    )
+    metrics.REGISTRY.register_collector(admission.export_metrics)
+    return admission
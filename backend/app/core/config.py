@@ -1,7 +1,7 @@
 import os
 import json
 from functools import lru_cache
-from typing import List, Union
+from typing import List, Optional, Union
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
 
@@ -177,6 +177,64 @@ class Settings(BaseSettings):
     smtp_password: str = ""
     admin_email: str = ""
     
+    # CV admission control
+    cv_max_concurrency: int = 0  # 0 = sized from the CPU quota (app.core.runtime)
+    cv_max_queue: int = 16
+    cv_queue_timeout_ms: int = 2000
+    cv_max_queue_per_session: int = 2
+    
+    # CV runtime threading
+    cv_opencv_threads: int = 0  # cv2.setNumThreads; 0 = from the CPU quota
+    cv_runtime_processes: int = 0  # Server processes sharing the quota; 0 = WEB_CONCURRENCY or 1
+    cv_runtime_self_tune: bool = False  # Measure worker/thread splits at startup
+    cv_runtime_tune_seconds: float = 3.0
+    cv_runtime_tune_image: Optional[str] = None  # Wrist photo for realistic tuning frames
+    
+    # WebSocket try-on quality control
+    tryon_latency_slo_ms: int = 120
+    tryon_gate_threshold: float = 2.0  # Mean abs thumbnail difference; 0 disables gating
+    tryon_gate_refresh_frames: int = 10
+    tryon_predict_max_interval: int = 3  # Detect every Nth frame at most under load; 1 disables
+    tryon_predict_error_budget: float = 0.15  # Prediction error as a fraction of wrist width
+    tryon_roi_scale: float = 3.5  # Suggested crop width in wrist widths
+    tryon_roi_full_frame_every: int = 15
+    
+    # Hand model tiers (lite, full, full-2hands)
+    hand_model_path: str = "hand_landmarker.task"
+    hand_model_lite_path: str = ""  # Empty: the lite tier runs the full model at low resolution
+    tryon_default_tier: str = "full-2hands"
+    tryon_tier_downgrade_load: float = 0.5  # CV queue fraction that moves sessions to cheaper tiers
+    tryon_tier_upgrade_load: float = 0.1
+
+    # Async render jobs
+    render_job_dir: str = "./render_jobs"
+    render_job_workers: int = 1  # Separate from the interactive CV workers
+    render_job_max_pending: int = 32
+    render_job_ttl_seconds: int = 3600
+    render_job_max_bytes: int = 512 * 1024 * 1024  # 512MB
+    upload_preview_max_width: int = 480  # Progressive upload preview
+    upload_preview_jpeg_quality: int = 75
+
+    # WebSocket sessions
+    ws_max_sessions: int = 64  # Per server process
+    ws_idle_timeout_seconds: float = 60.0  # Close sessions with no client message for this long
+    ws_heartbeat_interval_seconds: float = 15.0
+
+    # Graceful shutdown
+    shutdown_drain_seconds: float = 10.0  # Budget for sessions to leave and CV jobs to finish
+    shutdown_reconnect_min_ms: int = 1000
+    shutdown_reconnect_jitter_ms: int = 9000  # Clients reconnect after min + random(0..jitter) ms
+
+    # Observability
+    metrics_enabled: bool = True
+    tryon_record_dir: str = ""  # Set to record WebSocket try-on sessions for replay
+    tryon_record_max_frames: int = 1800
+    
+    # Debug profiling (requires DEBUG or PROFILING_ENABLED, plus X-Admin-Key)
+    profiling_enabled: bool = False
+    profiling_max_seconds: int = 30
+    admin_api_key: str = ""
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
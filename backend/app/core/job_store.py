@@ -0,0 +1,178 @@
+"""
+On-disk store for background render jobs
+One directory per job holding its state and output files, bounded by a
+TTL and a total size budget
+"""
+import json
+import logging
+import os
+import shutil
+import socket
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "job.json"
+FINAL_STATUSES = {"done", "failed"}
+# An unfinished job owned by another host is given up on after this long without progress
+ORPHAN_AFTER_SECONDS = 900
+
+
+class JobResult(BaseModel):
+    watch_id: str
+    filename: Optional[str] = None
+    hands_detected: bool = False
+    error: Optional[str] = None
+
+
+class JobState(BaseModel):
+    job_id: str
+    status: str = "queued"  # queued, running, done, failed
+    watch_ids: List[str]
+    output_format: str = "png"
+    tier: Optional[str] = None
+    done: int = 0
+    results: List[JobResult] = []
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+    expires_at: Optional[float] = None  # set once the job is final
+    owner: Optional[str] = None  # "host:pid" of the server process running it
+
+    @property
+    def final(self) -> bool:
+        return self.status in FINAL_STATUSES
+
+
+class JobStore:
+    """Job directories under `root`.
+
+    Finished jobs are kept for `ttl` seconds; when the store grows past
+    `max_bytes` the oldest finished jobs are evicted first. Unfinished jobs
+    are reported as failed only once orphaned: their owner process on this
+    host is gone (e.g. after a restart), or a job owned by another host has
+    made no progress for ORPHAN_AFTER_SECONDS. Jobs run by a sibling worker
+    process are returned as they are.
+    """
+
+    def __init__(self, root: Path, ttl: float, max_bytes: int):
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._live: Dict[str, JobState] = {}
+        self.host = socket.gethostname()
+
+    def job_dir(self, job_id: str) -> Path:
+        return self.root / job_id
+
+    def create(self, watch_ids: List[str], output_format: str, tier: Optional[str], image: bytes) -> JobState:
+        now = time.time()
+        job = JobState(
+            job_id=uuid.uuid4().hex,
+            watch_ids=watch_ids,
+            output_format=output_format,
+            tier=tier,
+            created_at=now,
+            updated_at=now,
+            owner=f"{self.host}:{os.getpid()}"
+        )
+        # Live before its directory exists, so a concurrent sweep never evicts it
+        self._live[job.job_id] = job
+        directory = self.job_dir(job.job_id)
+        try:
+            directory.mkdir()
+            (directory / "input").write_bytes(image)
+            self.save(job)
+        except BaseException:
+            self.delete(job.job_id)
+            raise
+        return job
+
+    def save(self, job: JobState) -> None:
+        job.updated_at = time.time()
+        if job.final:
+            job.expires_at = job.updated_at + self.ttl
+            self._live.pop(job.job_id, None)
+            input_path = self.job_dir(job.job_id) / "input"
+            input_path.unlink(missing_ok=True)
+        path = self.job_dir(job.job_id) / STATE_FILE
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(job.model_dump_json())
+        tmp.replace(path)
+
+    def get(self, job_id: str) -> Optional[JobState]:
+        if job_id in self._live:
+            return self._live[job_id]
+        if not job_id.isalnum():
+            return None
+        path = self.job_dir(job_id) / STATE_FILE
+        try:
+            job = JobState.model_validate_json(path.read_text())
+        except (OSError, ValueError):
+            return None
+        if not job.final and self._orphaned(job):
+            job.status = "failed"
+            job.error = "Interrupted by a server restart"
+            self.save(job)
+        if job.expires_at and job.expires_at < time.time():
+            self.delete(job_id)
+            return None
+        return job
+
+    def _orphaned(self, job: JobState) -> bool:
+        """True if no live process can still finish this unfinished job"""
+        host, _, pid = (job.owner or "").rpartition(":")
+        if host != self.host or not pid.isdigit():
+            return time.time() - job.updated_at > ORPHAN_AFTER_SECONDS
+        if int(pid) == os.getpid():
+            return True  # not in _live, so this process lost it (e.g. a cancelled task)
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass  # exists, owned by another user
+        return False
+
+    def output_path(self, job: JobState, filename: str) -> Path:
+        return self.job_dir(job.job_id) / filename
+
+    def delete(self, job_id: str) -> None:
+        self._live.pop(job_id, None)
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    def sweep(self) -> int:
+        """Delete expired jobs, then evict oldest finished ones over budget; returns removals"""
+        now = time.time()
+        finished = []
+        total = 0
+        removed = 0
+        for directory in self.root.iterdir():
+            if not directory.is_dir() or directory.name in self._live:
+                continue
+            try:
+                job = json.loads((directory / STATE_FILE).read_text())
+            except (OSError, ValueError):
+                job = {}
+            if job.get("expires_at") is not None and job["expires_at"] < now:
+                self.delete(directory.name)
+                removed += 1
+                continue
+            size = sum(f.stat().st_size for f in directory.iterdir() if f.is_file())
+            total += size
+            finished.append((job.get("updated_at", 0), directory.name, size))
+        for _, job_id, size in sorted(finished):
+            if total <= self.max_bytes:
+                break
+            self.delete(job_id)
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Render job store: removed {removed} job(s)")
+        return removed
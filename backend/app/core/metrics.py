@@ -0,0 +1,293 @@
+"""
+Lightweight Prometheus metrics for the try-on hot path
+Counters, gauges and histograms rendered in the Prometheus text format
+"""
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+ENABLED = get_settings().metrics_enabled
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels) -> None:
+        """Mirror a monotonic count kept elsewhere (e.g. lru_cache stats)"""
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, series in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {series[-1]}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Holds metrics and scrape-time collectors"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], None]) -> None:
+        """Add a callback that refreshes gauges right before each scrape"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {e}")
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "tryon_stage_seconds",
+    "Time spent in each try-on pipeline stage",
+    ["stage"]
+))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"]
+))
+WS_SESSIONS_ACTIVE = REGISTRY.register(Gauge(
+    "tryon_ws_sessions_active",
+    "Open try-on WebSocket sessions",
+    ["endpoint"]
+))
+WS_SESSIONS_CLOSED = REGISTRY.register(Counter(
+    "tryon_ws_sessions_closed_total",
+    "Ended try-on WebSocket sessions by reason (client, idle, reaped, rejected, error)",
+    ["endpoint", "reason"]
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "tryon_cache_requests_total",
+    "Watch asset cache lookups",
+    ["cache", "result"]
+))
+CV_WORKERS = REGISTRY.register(Gauge(
+    "cv_workers",
+    "CV worker pool slots",
+    ["state"]
+))
+CV_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "cv_queue_depth",
+    "CV jobs waiting for a worker",
+    ["priority"]
+))
+CV_JOBS = REGISTRY.register(Counter(
+    "cv_jobs_total",
+    "CV jobs by admission outcome",
+    ["outcome"]
+))
+DETECTION_GATE = REGISTRY.register(Counter(
+    "tryon_detection_gate_total",
+    "Frames by detection decision (detected, reused by the frame gate, predicted by the tracker)",
+    ["result"]
+))
+RENDER_JOBS = REGISTRY.register(Counter(
+    "render_jobs_total",
+    "Async render jobs by final status",
+    ["status"]
+))
+PROCESS_CPU_SECONDS = REGISTRY.register(Counter(
+    "process_cpu_seconds_total",
+    "Total user and system CPU time spent in seconds"
+))
+
+REGISTRY.register_collector(lambda: PROCESS_CPU_SECONDS.set(time.process_time()))
+
+
+# Per-request stage breakdown, reported via Server-Timing / WebSocket `timings`
+TIMING_GROUPS = {
+    "queue": "queue",
+    "b64decode": "decode",
+    "imdecode": "decode",
+    "resize": "decode",
+    "convert": "decode",
+    "detect": "detect",
+    "overlay": "render",
+    "encode": "encode",
+}
+
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def collect_timings() -> Dict[str, float]:
+    """Start collecting a stage breakdown (seconds per group) for the current request"""
+    timings = {group: 0.0 for group in dict.fromkeys(TIMING_GROUPS.values())}
+    _request_timings.set(timings)
+    return timings
+
+
+def record_timing(stage: str, elapsed: float) -> None:
+    timings = _request_timings.get()
+    if timings is not None:
+        group = TIMING_GROUPS.get(stage, stage)
+        timings[group] = timings.get(group, 0.0) + elapsed
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Format a stage breakdown as a Server-Timing header value (milliseconds)"""
+    return ", ".join(f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in timings.items())
+
+
+def timings_ms(timings: Dict[str, float]) -> Dict[str, float]:
+    return {name: round(elapsed * 1000, 2) for name, elapsed in timings.items()}
+
+
+class _StageTimer:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(elapsed, stage=self.stage)
+        record_timing(self.stage, elapsed)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def stage(name: str):
+    """Context manager timing one pipeline stage with a monotonic clock"""
+    if not ENABLED and _request_timings.get() is None:
+        return _NULL_TIMER
+    return _StageTimer(name)
@@ -0,0 +1,134 @@
+"""
+On-demand profiling for live workers
+A sampling profiler over all threads (collapsed stacks for flame graphs)
+and cProfile capture of a single try-on CV job
+"""
+import collections
+import contextvars
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_STORED_PROFILES = 20
+
+# Leaf frames of threads that are parked, filtered unless include_idle is set
+IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+}
+
+_sampling_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(duration: float, interval: float, include_idle: bool = False) -> Dict[str, int]:
+    """Sample every thread's Python stack via sys._current_frames.
+
+    Returns:
+        Collapsed stacks ("thread;outer;...;leaf") mapped to sample counts
+    """
+    own = threading.get_ident()
+    counts: Dict[str, int] = collections.Counter()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            leaf = frame.f_code
+            if not include_idle and (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_LEAVES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}"))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return counts
+
+
+def profile_worker(duration: float, interval: float, include_idle: bool = False) -> Optional[str]:
+    """Run the sampler if no other profile is running; collapsed-stack text or None if busy"""
+    if not _sampling_lock.acquire(blocking=False):
+        return None
+    try:
+        counts = sample_stacks(duration, interval, include_idle)
+    finally:
+        _sampling_lock.release()
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(counts.items()))
+
+
+class RequestProfile:
+    """cProfile capture of the first CV job run under one request"""
+
+    def __init__(self):
+        self.profile_id = uuid.uuid4().hex[:12]
+        self.profiler = cProfile.Profile()
+        self.captured = False
+
+    def run(self, fn: Callable[[], object]) -> object:
+        if self.captured:
+            return fn()
+        self.captured = True
+        self.profiler.enable()
+        try:
+            return fn()
+        finally:
+            self.profiler.disable()
+
+
+_request_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "request_profile", default=None
+)
+_stored_profiles: "collections.OrderedDict[str, RequestProfile]" = collections.OrderedDict()
+
+
+def start_request_profile() -> RequestProfile:
+    """Profile the next CV job started from the current request context"""
+    profile = RequestProfile()
+    _request_profile.set(profile)
+    return profile
+
+
+def current_request_profile() -> Optional[RequestProfile]:
+    return _request_profile.get()
+
+
+def store_profile(profile: RequestProfile) -> None:
+    _stored_profiles[profile.profile_id] = profile
+    while len(_stored_profiles) > MAX_STORED_PROFILES:
+        _stored_profiles.popitem(last=False)
+
+
+def get_profile(profile_id: str) -> Optional[RequestProfile]:
+    return _stored_profiles.get(profile_id)
+
+
+def pstats_text(profile: RequestProfile, limit: int = 50) -> str:
+    out = io.StringIO()
+    stats = pstats.Stats(profile.profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+def pstats_dump(profile: RequestProfile) -> bytes:
+    """Binary pstats, as written by Stats.dump_stats (snakeviz, flameprof, ...)"""
+    profile.profiler.create_stats()
+    return marshal.dumps(profile.profiler.stats)
@@ -0,0 +1,161 @@
+"""
+Adaptive quality control for WebSocket try-on sessions
+Steps a session's resolution, JPEG quality and frame interval to hold a latency SLO
+"""
+import logging
+import time
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.core.admission import CVAdmission
+
+logger = logging.getLogger(__name__)
+
+
+class QualityLevel(BaseModel):
+    """Client capture settings the server asks for"""
+    level: int
+    max_width: int
+    jpeg_quality: int
+    frame_interval_ms: int
+
+
+# Cheapest first
+QUALITY_LADDER: List[QualityLevel] = [
+    QualityLevel(level=0, max_width=320, jpeg_quality=50, frame_interval_ms=125),
+    QualityLevel(level=1, max_width=480, jpeg_quality=60, frame_interval_ms=83),
+    QualityLevel(level=2, max_width=640, jpeg_quality=70, frame_interval_ms=50),
+    QualityLevel(level=3, max_width=960, jpeg_quality=80, frame_interval_ms=40),
+    QualityLevel(level=4, max_width=1280, jpeg_quality=85, frame_interval_ms=33),
+]
+
+
+def queue_load(admission: Optional[CVAdmission]) -> float:
+    """Fraction of the CV wait queue in use, 0 when unknown"""
+    if admission is None or not admission.max_queue:
+        return 0.0
+    return admission.queue_depth / admission.max_queue
+
+
+class LadderController:
+    """Per-session latency feedback loop with hysteresis, stepping along a ladder.
+
+    Latency is tracked as an EWMA and evaluated once per window of frames.
+    The controller steps down after `down_windows` consecutive windows over
+    the SLO (or with queue load at `downgrade_load`) and steps up only after
+    `up_windows` consecutive windows well under it (and load at most
+    `upgrade_load`), with a cooldown between changes so it does not
+    oscillate. Subclasses say which steps are possible and apply them.
+    """
+
+    def __init__(
+        self,
+        slo_ms: float,
+        admission: Optional[CVAdmission] = None,
+        downgrade_load: float = 0.5,
+        upgrade_load: float = 0.25,
+        window: int = 15,
+        down_windows: int = 2,
+        up_windows: int = 4,
+        headroom: float = 0.6,
+        cooldown: float = 3.0
+    ):
+        self.slo_ms = slo_ms
+        self.admission = admission
+        self.downgrade_load = downgrade_load
+        self.upgrade_load = upgrade_load
+        self.window = window
+        self.down_windows = down_windows
+        self.up_windows = up_windows
+        self.headroom = headroom
+        self.cooldown = cooldown
+        self.latency_ms = 0.0
+        self._samples = 0
+        self._over = 0
+        self._under = 0
+        self._last_change = time.monotonic()
+
+    def _can_step(self, delta: int) -> bool:
+        raise NotImplementedError
+
+    def _record(self, latency_ms: float) -> int:
+        """Record one frame's latency; returns the step to take (-1, +1) or 0"""
+        if self._samples == 0 and self.latency_ms == 0.0:
+            self.latency_ms = latency_ms
+        self.latency_ms = 0.8 * self.latency_ms + 0.2 * latency_ms
+        self._samples += 1
+        if self._samples < self.window:
+            return 0
+        self._samples = 0
+
+        load = queue_load(self.admission)
+        if self.latency_ms > self.slo_ms or load >= self.downgrade_load:
+            self._over += 1
+            self._under = 0
+        elif self.latency_ms < self.slo_ms * self.headroom and load <= self.upgrade_load:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if time.monotonic() - self._last_change < self.cooldown:
+            return 0
+
+        if self._over >= self.down_windows and self._can_step(-1):
+            return -1
+        if self._under >= self.up_windows and self._can_step(+1):
+            return +1
+        return 0
+
+    def _changed(self) -> None:
+        self._over = self._under = 0
+        self._last_change = time.monotonic()
+
+
+class QualityController(LadderController):
+    """Steps a session along QUALITY_LADDER on queue + processing latency"""
+
+    def __init__(self, slo_ms: float, admission: Optional[CVAdmission] = None, start_level: int = 2, **kwargs):
+        super().__init__(slo_ms, admission, **kwargs)
+        self.level = max(0, min(start_level, len(QUALITY_LADDER) - 1))
+        self.queue_ms = 0.0
+
+    @property
+    def current(self) -> QualityLevel:
+        return QUALITY_LADDER[self.level]
+
+    def _can_step(self, delta: int) -> bool:
+        return 0 <= self.level + delta < len(QUALITY_LADDER)
+
+    def observe(self, queue_ms: float, process_ms: float) -> Optional[QualityLevel]:
+        """Record one frame; returns the new level when it changes"""
+        self.queue_ms = 0.8 * self.queue_ms + 0.2 * queue_ms
+        delta = self._record(queue_ms + process_ms)
+        return self._step(delta) if delta else None
+
+    def shed(self) -> Optional[QualityLevel]:
+        """Record a frame dropped because the CV workers were saturated.
+        
+        Counted as twice the SLO: a queue_full shed returns almost instantly,
+        and timing it would make an overloaded server look fast.
+        """
+        return self.observe(self.slo_ms * 2, 0.0)
+
+    def _step(self, delta: int) -> QualityLevel:
+        self.level += delta
+        self._changed()
+        logger.debug(
+            f"Quality level -> {self.level} (latency {self.latency_ms:.0f}ms, "
+            f"queue {self.queue_ms:.0f}ms, SLO {self.slo_ms:.0f}ms)"
+        )
+        return self.current
+
+    def control_message(self, reason: str) -> dict:
+        """Control message asking the client to adopt the current level"""
+        return {
+            "type": "quality",
+            **self.current.model_dump(),
+            "reason": reason,
+            "latency_ms": round(self.latency_ms, 1)
+        }
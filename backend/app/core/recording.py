@@ -0,0 +1,171 @@
+"""
+Try-on session recording
+Compact on-disk container for incoming WebSocket frames, their arrival
+times and watch changes, used to replay production sessions offline
+"""
+import base64
+import json
+import logging
+import queue
+import struct
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import IO, Iterator, NamedTuple, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TRYREC1\n"
+RECORD_HEADER = struct.Struct("<BdI")  # kind, seconds since session start, payload length
+
+KIND_META = 1
+KIND_FRAME = 2
+KIND_EVENT = 3
+KIND_NAMES = {KIND_META: "meta", KIND_FRAME: "frame", KIND_EVENT: "event"}
+
+
+class RecordedItem(NamedTuple):
+    kind: str  # "meta", "frame" or "event"
+    t: float   # seconds since the session started
+    data: Union[bytes, dict]  # encoded image bytes for frames, dict otherwise
+
+
+class SessionRecorder:
+    """Appends one session's frames and events to a .tryrec file.
+
+    Frames are stored as the client's encoded image bytes (no re-encode),
+    so a recording is roughly the size of the uploaded stream. Decoding
+    and disk writes happen on the recording's own writer thread, so the
+    event loop never waits on the disk; when the writer falls
+    `max_pending` items behind, further frames are dropped and counted.
+    """
+
+    def __init__(self, path: Path, meta: dict, max_frames: int = 0, max_pending: int = 256):
+        self.path = path
+        self.max_frames = max_frames
+        self.max_pending = max(1, max_pending)
+        self.frames = 0
+        self.dropped = 0
+        self._started = time.monotonic()
+        self._closed = False
+        self._file: IO[bytes] = open(path, "wb")
+        self._file.write(MAGIC)
+        self._write(KIND_META, self._elapsed(), json.dumps({
+            "version": 1,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            **meta
+        }).encode())
+        self._queue: "queue.SimpleQueue[Optional[Tuple[int, float, Union[bytes, str]]]]" = queue.SimpleQueue()
+        # Daemon: an unclosed recording must not hold up exit; readers tolerate a cut tail
+        self._writer = threading.Thread(target=self._run, name="session-recorder", daemon=True)
+        self._writer.start()
+
+    def _elapsed(self) -> float:
+        return time.monotonic() - self._started
+
+    def _write(self, kind: int, t: float, payload: bytes) -> None:
+        self._file.write(RECORD_HEADER.pack(kind, t, len(payload)))
+        self._file.write(payload)
+
+    def _run(self) -> None:
+        """Writer thread: decode and write queued records until close()"""
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                kind, t, payload = item
+                if isinstance(payload, str):
+                    if 'base64,' in payload:
+                        payload = payload.split('base64,')[1]
+                    try:
+                        payload = base64.b64decode(payload)
+                    except Exception as e:
+                        logger.warning(f"Skipping unrecordable frame: {e}")
+                        continue
+                self._write(kind, t, payload)
+        except Exception as e:
+            logger.error(f"Recording {self.path.name} failed: {e}")
+            self._closed = True
+        finally:
+            self._file.close()
+
+    @property
+    def active(self) -> bool:
+        return not self._closed
+
+    def frame(self, image_bytes: Union[bytes, str]) -> None:
+        """Queue an encoded frame; a str is taken as base64 (optionally data-URI)"""
+        if self._closed:
+            return
+        if self._queue.qsize() >= self.max_pending:
+            self.dropped += 1
+            return
+        self._queue.put((KIND_FRAME, self._elapsed(), image_bytes))
+        self.frames += 1
+        if self.max_frames and self.frames >= self.max_frames:
+            logger.info(f"Recording {self.path.name} reached {self.max_frames} frames")
+            self.close()
+
+    def frame_b64(self, frame_data: str) -> None:
+        """Record a base64 (optionally data-URI) frame as raw image bytes"""
+        self.frame(frame_data)
+
+    def event(self, event_type: str, **data) -> None:
+        if self._closed:
+            return
+        self._queue.put((KIND_EVENT, self._elapsed(), json.dumps({"type": event_type, **data}).encode()))
+
+    def close(self) -> None:
+        """Stop recording; the writer thread flushes what is queued and closes the file"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        if self.dropped:
+            logger.warning(f"Recording {self.path.name} dropped {self.dropped} frame(s) behind a slow disk")
+
+
+def start_recording(record_dir: str, endpoint: str, max_frames: int = 0, **meta) -> Optional[SessionRecorder]:
+    """Open a recorder for a new session, or None if recording is disabled"""
+    if not record_dir:
+        return None
+    try:
+        directory = Path(record_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.tryrec"
+        recorder = SessionRecorder(directory / name, {"endpoint": endpoint, **meta}, max_frames)
+        logger.info(f"Recording try-on session to {recorder.path}")
+        return recorder
+    except Exception as e:
+        logger.error(f"Could not start session recording: {e}")
+        return None
+
+
+def read_recording(path: Union[str, Path]) -> Iterator[RecordedItem]:
+    """Iterate the items of a .tryrec file in arrival order"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a try-on recording: {path}")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return  # a truncated tail is tolerated (session cut mid-write)
+            kind, t, length = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            name = KIND_NAMES.get(kind, "unknown")
+            data = payload if kind == KIND_FRAME else json.loads(payload)
+            yield RecordedItem(name, t, data)
+
+
+def recorded_frames(path: Union[str, Path]) -> Iterator[Tuple[float, bytes, Optional[str]]]:
+    """Yield (arrival time, image bytes, active watch id) for each recorded frame"""
+    watch_id = None
+    for item in read_recording(path):
+        if item.kind == "event" and item.data.get("type") == "watch":
+            watch_id = item.data.get("watch_id")
+        elif item.kind == "frame":
+            yield item.t, item.data, watch_id
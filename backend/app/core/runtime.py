@@ -0,0 +1,227 @@
+"""
+CPU-aware CV runtime configuration
+Sizes the CV worker pool and OpenCV's thread pool together from the
+container's CPU quota, so uvicorn workers x CV workers x library threads
+do not oversubscribe the node
+"""
+import logging
+import math
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+from pydantic import BaseModel
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+class CPUBudget(BaseModel):
+    """CPUs this process may use"""
+    node_cpus: float  # quota or affinity of the whole container
+    source: str  # "cgroup v2", "cgroup v1", "affinity" or "cpu_count"
+    processes: int  # server processes sharing the budget
+    per_process: float
+
+
+class RuntimePlan(BaseModel):
+    """Thread and executor sizes applied at startup"""
+    budget: CPUBudget
+    cv_workers: int  # CVAdmission concurrency
+    opencv_threads: int  # cv2.setNumThreads
+    tuned: bool = False
+    trials: List[dict] = []
+
+
+def cgroup_cpu_limit(root: Path = CGROUP_ROOT) -> Optional[Tuple[float, str]]:
+    """CPU quota from cgroup v2 (cpu.max) or v1 (cfs_quota/period), None if unlimited"""
+    try:
+        quota, period = (root / "cpu.max").read_text().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period), "cgroup v2"
+        return None
+    except (OSError, ValueError):
+        pass
+    for directory in (root / "cpu", root / "cpu,cpuacct"):
+        try:
+            quota = int((directory / "cpu.cfs_quota_us").read_text())
+            period = int((directory / "cpu.cfs_period_us").read_text())
+        except (OSError, ValueError):
+            continue
+        if quota > 0 and period > 0:
+            return quota / period, "cgroup v1"
+        return None
+    return None
+
+
+def available_cpus() -> Tuple[float, str]:
+    """Usable CPUs for the container: the smaller of the cgroup quota and CPU affinity"""
+    try:
+        cpus, source = float(len(os.sched_getaffinity(0))), "affinity"
+    except AttributeError:
+        cpus, source = float(os.cpu_count() or 1), "cpu_count"
+    limit = cgroup_cpu_limit()
+    if limit is not None and limit[0] < cpus:
+        cpus, source = limit
+    return cpus, source
+
+
+def cpu_budget(processes: int = 0) -> CPUBudget:
+    """Share of the container's CPUs for this server process.
+
+    `processes` 0 means WEB_CONCURRENCY (uvicorn's worker count) or 1.
+    """
+    cpus, source = available_cpus()
+    if processes <= 0:
+        try:
+            processes = int(os.environ.get("WEB_CONCURRENCY", "1"))
+        except ValueError:
+            processes = 1
+    processes = max(1, processes)
+    return CPUBudget(node_cpus=cpus, source=source, processes=processes, per_process=cpus / processes)
+
+
+def default_split(cores: int) -> Tuple[int, int]:
+    """(cv_workers, opencv_threads) for a core count: parallelism across frames first.
+
+    Each worker also runs a MediaPipe/TFLite inference, which keeps its own
+    threads, so one OpenCV thread per worker leaves room for it.
+    """
+    return max(1, cores), 1
+
+
+def candidate_splits(cores: int) -> List[Tuple[int, int]]:
+    """Worker/thread splits whose product fits the core budget"""
+    splits = {(w, max(1, cores // w)) for w in range(1, max(1, cores) + 1)}
+    return sorted(splits)
+
+
+def _tuning_workload(image_path: Optional[str] = None):
+    """One try-on frame end to end: decode, detect, render, encode.
+    
+    A wrist photo (cv_runtime_tune_image) gives realistic detection cost.
+    Without one, or if no hand is found in it, the frame is blurred noise:
+    palm detection then exits early, so the watch is rendered at a fixed
+    synthetic placement to keep the render step in the measurement.
+    """
+    import numpy as np
+
+    from app.cv.watch_tryon import WatchTryOn
+
+    watch = Path(__file__).resolve().parent.parent.parent / "assets" / "watches" / "Speedmaster.png"
+    tryon = WatchTryOn(str(watch))
+    frame = cv2.imread(image_path, cv2.IMREAD_COLOR) if image_path else None
+    if frame is None:
+        if image_path:
+            logger.warning(f"Could not read tuning image {image_path}; using a synthetic frame")
+        rng = np.random.default_rng(0)
+        frame = cv2.GaussianBlur(rng.integers(0, 255, size=(720, 1280, 3), dtype=np.uint8), (0, 0), 3)
+    encoded = cv2.imencode('.jpg', frame)[1].tobytes()
+    fallback = None
+    if not tryon.process_frame(frame).get("hands_detected"):
+        logger.warning("No hand in the tuning frame; detection timings will be optimistic")
+        wrist = {"wrist_x": 0.5, "wrist_y": 0.6, "wrist_width": 0.15, "rotation": 0.0}
+        fallback = {"hands_detected": True, "landmarks": wrist, "hands": [wrist]}
+
+    def run_frame() -> None:
+        img = cv2.imdecode(np.frombuffer(encoded, np.uint8), cv2.IMREAD_COLOR)
+        result = tryon.process_frame(img)
+        if not result.get("hands_detected"):
+            result = fallback or result
+        if result.get("hands_detected"):
+            img = tryon.render(img, result)
+        cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 85])
+
+    return tryon, run_frame
+
+
+def self_tune(
+    cores: int,
+    seconds: float,
+    slo_ms: float,
+    image_path: Optional[str] = None
+) -> Tuple[Tuple[int, int], List[dict]]:
+    """Time each candidate split on a try-on frame load and pick the one
+    with the best throughput whose p95 latency meets the SLO.
+    
+    Each trial thread gets its own landmarker, as the CV workers do.
+    """
+    tryon, run_frame = _tuning_workload(image_path)
+    splits = candidate_splits(cores)
+    per_trial = max(0.2, seconds / len(splits))
+    trials = []
+    for workers, threads in splits:
+        cv2.setNumThreads(threads)
+        latencies: List[float] = []
+
+        def timed() -> None:
+            started = time.perf_counter()
+            run_frame()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Create every thread's landmarker outside the timed trial
+            barrier = threading.Barrier(workers)
+            list(pool.map(lambda _: (run_frame(), barrier.wait()), range(workers)))
+            started = time.perf_counter()
+            while time.perf_counter() - started < per_trial:
+                list(pool.map(lambda _: timed(), range(workers)))
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        trials.append({
+            "cv_workers": workers,
+            "opencv_threads": threads,
+            "fps": round(len(latencies) / elapsed, 2),
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+            "median_ms": round(statistics.median(latencies), 2)
+        })
+    tryon.close()
+    within_slo = [t for t in trials if t["p95_ms"] <= slo_ms]
+    if within_slo:
+        best = max(within_slo, key=lambda t: (t["fps"], -t["opencv_threads"]))
+    else:
+        best = min(trials, key=lambda t: t["p95_ms"])
+    return (best["cv_workers"], best["opencv_threads"]), trials
+
+
+@lru_cache()
+def get_runtime_plan() -> RuntimePlan:
+    """Compute and apply the plan once per process.
+
+    Explicit cv_max_concurrency / cv_opencv_threads settings win over the
+    budget; with cv_runtime_self_tune the split is measured at startup.
+    """
+    settings = get_settings()
+    budget = cpu_budget(settings.cv_runtime_processes)
+    cores = max(1, math.floor(budget.per_process))
+    workers, threads = default_split(cores)
+    tuned, trials = False, []
+    if settings.cv_runtime_self_tune:
+        try:
+            (workers, threads), trials = self_tune(cores, settings.cv_runtime_tune_seconds,
+                                                   settings.tryon_latency_slo_ms,
+                                                   settings.cv_runtime_tune_image)
+            tuned = True
+        except Exception as e:
+            logger.error(f"CV runtime self-tuning failed, using defaults: {e}")
+    if settings.cv_max_concurrency > 0:
+        workers = settings.cv_max_concurrency
+    if settings.cv_opencv_threads > 0:
+        threads = settings.cv_opencv_threads
+
+    cv2.setNumThreads(threads)
+    plan = RuntimePlan(budget=budget, cv_workers=workers, opencv_threads=threads, tuned=tuned, trials=trials)
+    logger.info(
+        f"CV runtime: {budget.node_cpus:g} CPUs ({budget.source}) / {budget.processes} process(es) -> "
+        f"{workers} CV worker(s) x {threads} OpenCV thread(s){' (self-tuned)' if tuned else ''}"
+    )
+    return plan
@@ -0,0 +1,295 @@
+"""
+WebSocket session registry
+Caps live try-on sessions per process, sends heartbeats, times out idle
+clients, reaps sessions whose sockets died without closing and drains
+sessions on shutdown
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Set
+
+from fastapi import WebSocket
+
+from app.core import metrics
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Close codes (RFC 6455)
+CLOSE_GOING_AWAY = 1001
+CLOSE_SERVICE_RESTART = 1012
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+class SessionEnded(Exception):
+    """Raised by WSSession.receive when the server ends the session"""
+    reason = "server"
+
+
+class SessionIdle(SessionEnded):
+    """The client has been silent too long"""
+    reason = "idle"
+
+
+class SessionDraining(SessionEnded):
+    """The server is shutting down; the client was told to reconnect"""
+    reason = "drain"
+
+
+def reconnect_message(min_ms: int, jitter_ms: int) -> dict:
+    """Ask a client to reconnect after a random delay, so a restart does not
+    bring every client back at the same instant"""
+    return {"type": "reconnect", "reason": "shutdown", "retry_after_ms": min_ms + random.randint(0, max(0, jitter_ms))}
+
+
+class WSSession:
+    """One registered WebSocket and the resources to free when it ends"""
+
+    def __init__(self, websocket: WebSocket, endpoint: str, idle_timeout: float, heartbeat_interval: float):
+        self.websocket = websocket
+        self.endpoint = endpoint
+        self.key = f"ws:{id(websocket)}"
+        self.idle_timeout = idle_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.opened_at = time.monotonic()
+        self.last_seen = self.opened_at
+        self.close_reason = "client"
+        self.task: Optional[asyncio.Task] = asyncio.current_task()
+        self._release: List[Callable[[], None]] = []
+        self._held: Set[asyncio.Future] = set()
+        self._pending: Optional[asyncio.Future] = None
+        self._drain: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.released = False
+
+    def on_release(self, fn: Callable[[], None]) -> None:
+        """Register cleanup (buffers, detectors, recorders) run once when the session ends"""
+        self._release.append(fn)
+
+    def hold(self, future: asyncio.Future) -> None:
+        """Keep resources until `future` is done, e.g. a CV job still using the
+        session's buffers on a worker after the session task was cancelled"""
+        self._held.add(future)
+        future.add_done_callback(self._unhold)
+
+    def _unhold(self, future: asyncio.Future) -> None:
+        self._held.discard(future)
+        if not future.cancelled():
+            future.exception()  # seen by the session loop, or dropped with the session
+        if self.released and not self._held:
+            self._run_release()
+
+    def idle_for(self, now: Optional[float] = None) -> float:
+        return (now or time.monotonic()) - self.last_seen
+
+    def drain(self, message: dict) -> None:
+        """End the session at its next receive, after sending `message`.
+        
+        A frame already being processed finishes and is answered first.
+        """
+        if not self._drain.done():
+            self._drain.set_result(message)
+
+    async def receive(self) -> dict:
+        """Next ASGI message from the client, sending heartbeats while it is quiet
+
+        Raises:
+            SessionIdle: after idle_timeout seconds without a client message
+            SessionDraining: once the server drains sessions for shutdown
+        """
+        while True:
+            if self._drain.done():
+                try:
+                    await self.websocket.send_text(json.dumps(self._drain.result()))
+                except Exception:
+                    pass
+                raise SessionDraining("Server shutting down")
+            remaining = self.idle_timeout - self.idle_for()
+            if remaining <= 0:
+                raise SessionIdle(f"No message for {self.idle_timeout:.0f}s")
+            # The pending receive survives heartbeat timeouts, so no message is lost
+            if self._pending is None:
+                self._pending = asyncio.ensure_future(self.websocket.receive())
+            done, _ = await asyncio.wait(
+                {self._pending, self._drain},
+                timeout=min(self.heartbeat_interval, remaining),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if self._drain.done():
+                continue
+            if done:
+                message = self._pending.result()
+                self._pending = None
+                self.last_seen = time.monotonic()
+                return message
+            if self.idle_for() < self.idle_timeout:
+                await self.websocket.send_text(json.dumps({"type": "heartbeat"}))
+
+    def release_resources(self) -> None:
+        """Run the cleanup callbacks now, or once the last held job finishes"""
+        if self.released:
+            return
+        self.released = True
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        if not self._held:
+            self._run_release()
+
+    def _run_release(self) -> None:
+        for fn in reversed(self._release):
+            try:
+                fn()
+            except Exception as e:
+                logger.error(f"Session cleanup failed: {e}")
+        self._release.clear()
+
+
+class SessionRegistry:
+    """Live WebSocket sessions of this process.
+
+    At most `max_sessions` are admitted; more are told to retry and closed
+    with 1013. A session silent for `idle_timeout` seconds is closed by its
+    own receive loop; the reaper catches loops stuck elsewhere (e.g. a send
+    to a dead socket) and cancels them, freeing their resources. On
+    shutdown, drain() turns new connections away and asks open ones to
+    reconnect elsewhere.
+    """
+
+    def __init__(self, max_sessions: int, idle_timeout: float, heartbeat_interval: float):
+        self.max_sessions = max(1, max_sessions)
+        self.idle_timeout = idle_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self._sessions: Dict[str, WSSession] = {}
+        self.rejected_total = 0
+        self.reaped_total = 0
+        self.draining = False
+        self.reconnect_min_ms = 1000
+        self.reconnect_jitter_ms = 9000
+
+    @property
+    def active(self) -> int:
+        return len(self._sessions)
+
+    async def admit(self, websocket: WebSocket, endpoint: str) -> Optional[WSSession]:
+        """Accept and register a WebSocket, or reject it when at capacity or draining (returns None)"""
+        await websocket.accept()
+        if self.draining:
+            metrics.WS_SESSIONS_CLOSED.inc(endpoint=endpoint, reason="drain")
+            try:
+                await websocket.send_text(json.dumps(reconnect_message(self.reconnect_min_ms, self.reconnect_jitter_ms)))
+                await websocket.close(code=CLOSE_SERVICE_RESTART)
+            except Exception:
+                pass
+            return None
+        if len(self._sessions) >= self.max_sessions:
+            self.rejected_total += 1
+            metrics.WS_SESSIONS_CLOSED.inc(endpoint=endpoint, reason="rejected")
+            logger.warning(f"Rejecting WebSocket on {endpoint}: {len(self._sessions)} sessions open")
+            try:
+                await websocket.send_text(json.dumps({"type": "busy", "retry_after_ms": 5000}))
+                await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+            except Exception:
+                pass
+            return None
+        session = WSSession(websocket, endpoint, self.idle_timeout, self.heartbeat_interval)
+        self._sessions[session.key] = session
+        metrics.WS_SESSIONS_ACTIVE.inc(endpoint=endpoint)
+        return session
+
+    async def release(self, session: WSSession) -> None:
+        """Unregister, free resources and close the socket; safe to call twice"""
+        if self._sessions.pop(session.key, None) is None:
+            return
+        session.release_resources()
+        metrics.WS_SESSIONS_ACTIVE.dec(endpoint=session.endpoint)
+        metrics.WS_SESSIONS_CLOSED.inc(endpoint=session.endpoint, reason=session.close_reason)
+        try:
+            if session.close_reason == "drain":
+                code = CLOSE_SERVICE_RESTART
+            elif session.close_reason in ("idle", "reaped"):
+                code = CLOSE_GOING_AWAY
+            else:
+                code = 1000
+            await session.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def reap(self) -> int:
+        """Cancel sessions silent well past the idle timeout; returns how many"""
+        now = time.monotonic()
+        limit = self.idle_timeout + self.heartbeat_interval
+        reaped = 0
+        for session in list(self._sessions.values()):
+            if session.idle_for(now) <= limit:
+                continue
+            session.close_reason = "reaped"
+            session.release_resources()
+            if session.task is not None and not session.task.done():
+                session.task.cancel()  # its finally block unregisters the session
+            else:
+                self._sessions.pop(session.key, None)
+                metrics.WS_SESSIONS_ACTIVE.dec(endpoint=session.endpoint)
+                metrics.WS_SESSIONS_CLOSED.inc(endpoint=session.endpoint, reason="reaped")
+            reaped += 1
+        if reaped:
+            self.reaped_total += reaped
+            logger.warning(f"Reaped {reaped} dead WebSocket session(s)")
+        return reaped
+
+    async def drain(self, timeout: float) -> int:
+        """Stop admitting, ask every client to reconnect with jittered backoff
+        and wait up to `timeout` for sessions to end; the rest are cancelled.
+        
+        Returns:
+            Number of sessions that had to be cancelled
+        """
+        self.draining = True
+        sessions = list(self._sessions.values())
+        if sessions:
+            logger.info(f"Draining {len(sessions)} WebSocket session(s)")
+        for session in sessions:
+            session.close_reason = "drain"
+            session.drain(reconnect_message(self.reconnect_min_ms, self.reconnect_jitter_ms))
+        deadline = time.monotonic() + timeout
+        while self._sessions and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        stuck = [s.task for s in self._sessions.values() if s.task is not None and not s.task.done()]
+        for task in stuck:
+            task.cancel()
+        if stuck:
+            logger.warning(f"Cancelled {len(stuck)} WebSocket session(s) still open after {timeout:.0f}s")
+            await asyncio.wait(stuck, timeout=1.0)
+        return len(stuck)
+
+    async def run_reaper(self) -> None:
+        """Background task started by the app lifespan"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            self.reap()
+
+    def snapshot(self) -> dict:
+        return {
+            "active": len(self._sessions),
+            "capacity": self.max_sessions,
+            "rejected_total": self.rejected_total,
+            "reaped_total": self.reaped_total,
+            "idle_timeout_s": self.idle_timeout,
+            "draining": self.draining,
+        }
+
+
+@lru_cache()
+def get_session_registry() -> SessionRegistry:
+    settings = get_settings()
+    registry = SessionRegistry(
+        settings.ws_max_sessions,
+        settings.ws_idle_timeout_seconds,
+        settings.ws_heartbeat_interval_seconds
+    )
+    registry.reconnect_min_ms = settings.shutdown_reconnect_min_ms
+    registry.reconnect_jitter_ms = settings.shutdown_reconnect_jitter_ms
+    return registry
@@ -0,0 +1,120 @@
+"""
+Hand model inference tiers
+Speed/accuracy tiers selectable per request or session, with automatic
+downgrade while the CV workers are overloaded
+"""
+import logging
+import time
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from app.core.admission import CVAdmission
+from app.core.config import get_settings
+from app.core.quality import LadderController, QualityController, queue_load
+
+logger = logging.getLogger(__name__)
+
+
+class ModelTier(BaseModel):
+    """One detector configuration"""
+    name: str
+    model: str  # "lite" or "full" landmark model
+    num_hands: int
+    max_input_width: int  # frames are downscaled to this before detection; 0 = as sent
+
+
+# Cheapest first
+MODEL_TIERS: List[ModelTier] = [
+    ModelTier(name="lite", model="lite", num_hands=1, max_input_width=320),
+    ModelTier(name="full", model="full", num_hands=1, max_input_width=0),
+    ModelTier(name="full-2hands", model="full", num_hands=2, max_input_width=0),
+]
+TIERS_BY_NAME: Dict[str, ModelTier] = {tier.name: tier for tier in MODEL_TIERS}
+
+
+def get_tier(name: Optional[str] = None) -> ModelTier:
+    """Tier by name, or the configured default
+
+    Raises:
+        ValueError: for an unknown tier name
+    """
+    name = name or get_settings().tryon_default_tier
+    tier = TIERS_BY_NAME.get(name)
+    if tier is None:
+        raise ValueError(f"Unknown model tier '{name}', expected one of {list(TIERS_BY_NAME)}")
+    return tier
+
+
+def governed_tier(requested: ModelTier, admission: Optional[CVAdmission]) -> ModelTier:
+    """Stateless downgrade for one-off requests: one tier cheaper past the
+    downgrade threshold, the cheapest tier when the queue is nearly full"""
+    settings = get_settings()
+    load = queue_load(admission)
+    index = MODEL_TIERS.index(requested)
+    if load >= 0.9:
+        index = 0
+    elif load >= settings.tryon_tier_downgrade_load:
+        index = max(0, index - 1)
+    return MODEL_TIERS[index]
+
+
+class TierGovernor(LadderController):
+    """Per-session tier feedback loop, the last resort after quality.
+
+    The session runs at most at its requested tier. It steps to a cheaper
+    tier only once its QualityController has bottomed out at level 0 and
+    load or latency stays high, and back up towards the requested tier
+    when both are well under their limits; see LadderController.
+    """
+
+    def __init__(
+        self,
+        requested: ModelTier,
+        slo_ms: float,
+        admission: Optional[CVAdmission] = None,
+        quality: Optional[QualityController] = None,
+        downgrade_load: float = 0.5,
+        upgrade_load: float = 0.1,
+        cooldown: float = 5.0,
+        **kwargs
+    ):
+        super().__init__(slo_ms, admission, downgrade_load, upgrade_load, cooldown=cooldown, **kwargs)
+        self.requested = requested
+        self.tier = requested
+        self.quality = quality
+
+    def request(self, tier: ModelTier) -> None:
+        """Client picked a new tier; it applies immediately as the new ceiling"""
+        self.requested = tier
+        self.tier = tier
+        self._changed()
+
+    def _can_step(self, delta: int) -> bool:
+        index = MODEL_TIERS.index(self.tier) + delta
+        if delta < 0:
+            # Cheaper capture settings come first; the model is the last thing to give up,
+            # once quality has sat at level 0 for a cooldown without relief
+            return index >= 0 and (self.quality is None or (
+                self.quality.level == 0 and time.monotonic() - self.quality._last_change >= self.cooldown
+            ))
+        return index <= MODEL_TIERS.index(self.requested)
+
+    def observe(self, latency_ms: float) -> Optional[ModelTier]:
+        """Record one detected frame; returns the new tier when it changes"""
+        delta = self._record(latency_ms)
+        return self._move(MODEL_TIERS.index(self.tier) + delta) if delta else None
+
+    def _move(self, index: int) -> ModelTier:
+        self.tier = MODEL_TIERS[index]
+        self._changed()
+        logger.debug(f"Model tier -> {self.tier.name} (latency {self.latency_ms:.0f}ms, SLO {self.slo_ms:.0f}ms)")
+        return self.tier
+
+    def control_message(self, reason: str) -> dict:
+        return {
+            "type": "tier",
+            "tier": self.tier.name,
+            "requested": self.requested.name,
+            "reason": reason
+        }
@@ -0,0 +1,293 @@
+"""
+Offline batch renderer for pre-rendered try-on galleries
+
+Renders every catalog watch onto a directory of wrist photos across a
+process pool. Each photo is decoded and detected once, then all watches
+are drawn from that detection.
+
+Output is CDN-ready: every render is named after a fingerprint of its
+inputs and settings, so files are immutable and can be cached forever;
+manifest.json (the only mutable file) maps photo x watch to its render.
+Re-running skips renders that already exist, so an interrupted run
+resumes where it stopped.
+
+Usage (from backend/):
+    python -m app.cv.batch photos/ --out gallery/
+    python -m app.cv.batch photos/ --out gallery/ --watch-ids 1,3 --format jpg --workers 4
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from app.core.runtime import available_cpus
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+OUTPUT_FORMATS = {
+    "webp": ('.webp', cv2.IMWRITE_WEBP_QUALITY),
+    "jpg": ('.jpg', cv2.IMWRITE_JPEG_QUALITY),
+    "png": ('.png', None),
+}
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Per-process state, set up once by _init_worker
+_worker: dict = {}
+
+
+def file_sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def render_fingerprint(image_sha: str, watch_sha: str, settings: dict) -> str:
+    """Short hash of everything a render depends on; part of its file name"""
+    key = json.dumps([image_sha, watch_sha, settings], sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()[:12]
+
+
+def find_images(source: Path) -> List[Path]:
+    return sorted(p for p in source.rglob("*") if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+def _init_worker(watch_paths: Dict[str, str], tier_name: str) -> None:
+    """Load the detector and watch overlays once per worker process"""
+    logging.basicConfig(level=logging.WARNING)
+    # Parallelism comes from the pool; one OpenCV thread per process avoids oversubscription
+    cv2.setNumThreads(1)
+    from app.core.tiers import get_tier
+    from app.cv.buffers import BufferPool
+    from app.cv.watch_overlay import WatchOverlay
+    from app.cv.watch_tryon import WatchTryOn
+
+    first = next(iter(watch_paths.values()))
+    _worker["tier"] = get_tier(tier_name)
+    _worker["detector"] = WatchTryOn(first)
+    _worker["overlays"] = {watch_id: WatchOverlay(path) for watch_id, path in watch_paths.items()}
+    _worker["buffers"] = BufferPool()
+
+
+def render_image(source: str, outputs: Dict[str, str], max_width: int, fmt: str, quality: int) -> dict:
+    """Detect once on one photo and write a render per watch; runs in a worker process"""
+    from app.cv.watch_overlay import placement_from_wrist
+
+    img = cv2.imread(source, cv2.IMREAD_COLOR)
+    if img is None:
+        return {"error": "Could not decode image"}
+    height, width = img.shape[:2]
+    if max_width and width > max_width:
+        img = cv2.resize(img, (max_width, round(height * max_width / width)), interpolation=cv2.INTER_AREA)
+
+    buffers = _worker["buffers"]
+    result = _worker["detector"].process_frame(img, buffers, _worker["tier"])
+    if result.get("error"):
+        # A failed detection is not "no hands"; it must be retried on the next run
+        return {"error": f"Detection failed: {result['error']}"}
+    hands = result.get("hands") or []
+    entry = {"width": img.shape[1], "height": img.shape[0], "hands": len(hands), "renders": {}}
+    if not hands:
+        return entry
+
+    placements = [placement_from_wrist(hand, img.shape) for hand in hands]
+    ext, quality_flag = OUTPUT_FORMATS[fmt]
+    params = [quality_flag, quality] if quality_flag is not None else []
+    frame = np.empty_like(img)
+    for watch_id, out in outputs.items():
+        np.copyto(frame, img)
+        frame = _worker["overlays"][watch_id].apply_many(frame, placements, buffers)
+        success, encoded = cv2.imencode(ext, frame, params)
+        if not success:
+            entry.setdefault("errors", {})[watch_id] = f"Failed to encode result as {ext}"
+            continue
+        out_path = Path(out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out_path.with_name(out_path.name + ".tmp")
+        tmp.write_bytes(encoded.tobytes())
+        tmp.replace(out_path)
+        entry["renders"][watch_id] = out_path.name
+    return entry
+
+
+def load_manifest(path: Path) -> dict:
+    try:
+        manifest = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+    return manifest if manifest.get("version") == MANIFEST_VERSION else {}
+
+
+def write_manifest(path: Path, manifest: dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    tmp.replace(path)
+
+
+def run_batch(
+    source: Path,
+    out: Path,
+    watch_ids: Optional[List[str]] = None,
+    tier_name: Optional[str] = None,
+    fmt: str = "webp",
+    quality: int = 85,
+    max_width: int = 1600,
+    workers: Optional[int] = None,
+    force: bool = False,
+    allow_mock: bool = False
+) -> dict:
+    """Render the photo x watch matrix into `out`; returns a run summary"""
+    from app.api.tryon import WATCH_IMAGES_DIR, WATCHES_DB
+    from app.core.tiers import get_tier
+    from app.cv.models import get_model_registry
+
+    tier = get_tier(tier_name)
+    model = get_model_registry().get(tier.model)
+    if model is None and not allow_mock:
+        raise SystemExit("Hand model not found; refusing to render a gallery from mock landmarks (--allow-mock)")
+
+    watches = {}
+    for watch_id, watch in WATCHES_DB.items():
+        path = WATCH_IMAGES_DIR / watch.image_path
+        if watch_ids and watch_id not in watch_ids:
+            continue
+        if not path.is_file():
+            logger.warning(f"Skipping watch {watch_id}: image not found at {path}")
+            continue
+        watches[watch_id] = {"name": watch.name, "path": str(path), "sha256": file_sha256(path)}
+    if not watches:
+        raise SystemExit("No watches to render")
+
+    # The model version is part of every fingerprint, so a model upgrade re-renders under new names
+    settings = {
+        "tier": tier.name,
+        "model": model.version if model is not None else "mock",
+        "format": fmt,
+        "quality": quality,
+        "max_width": max_width
+    }
+    out.mkdir(parents=True, exist_ok=True)
+    manifest_path = out / MANIFEST
+    previous = {} if force else load_manifest(manifest_path)
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "settings": settings,
+        "watches": {watch_id: {"name": w["name"], "sha256": w["sha256"]} for watch_id, w in watches.items()},
+        "images": {}
+    }
+
+    ext = OUTPUT_FORMATS[fmt][0]
+    pending = {}
+    skipped = 0
+    for image in find_images(source):
+        key = image.relative_to(source).as_posix()
+        image_sha = file_sha256(image)
+        directory = out / image.relative_to(source).with_suffix("")
+        outputs = {
+            watch_id: str(directory / f"{watch_id}.{render_fingerprint(image_sha, w['sha256'], settings)}{ext}")
+            for watch_id, w in watches.items()
+        }
+        known = previous.get("images", {}).get(key, {})
+        no_hands = known.get("sha256") == image_sha and previous.get("settings") == settings and known.get("hands") == 0
+        if not force and (no_hands or all(Path(p).is_file() for p in outputs.values())):
+            manifest["images"][key] = {
+                **known,
+                "sha256": image_sha,
+                "renders": {} if no_hands else {
+                    watch_id: Path(p).relative_to(out).as_posix() for watch_id, p in outputs.items()
+                }
+            }
+            skipped += 1
+            continue
+        pending[key] = (str(image), image_sha, outputs)
+
+    logger.info(f"{len(pending)} photo(s) to render, {skipped} already done, {len(watches)} watch(es)")
+    start = time.perf_counter()
+    failed = 0
+    pool = ProcessPoolExecutor(
+        max_workers=workers or max(1, math.floor(available_cpus()[0])),
+        mp_context=get_context("spawn"),
+        initializer=_init_worker,
+        initargs=({watch_id: w["path"] for watch_id, w in watches.items()}, tier.name)
+    )
+    with pool:
+        futures = {
+            pool.submit(render_image, path, outputs, max_width, fmt, quality): (key, image_sha, outputs)
+            for key, (path, image_sha, outputs) in pending.items()
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            key, image_sha, outputs = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                entry = {"error": str(e)}
+            if "error" in entry:
+                failed += 1
+                logger.error(f"[{done}/{len(futures)}] {key}: {entry['error']}")
+                continue
+            entry["sha256"] = image_sha
+            entry["renders"] = {
+                watch_id: Path(outputs[watch_id]).relative_to(out).as_posix() for watch_id in entry["renders"]
+            }
+            manifest["images"][key] = entry
+            # Written after every photo so an interrupted run keeps its progress
+            write_manifest(manifest_path, manifest)
+            logger.info(f"[{done}/{len(futures)}] {key}: {entry['hands']} hand(s), {len(entry['renders'])} render(s)")
+
+    write_manifest(manifest_path, manifest)
+    return {
+        "photos": len(pending) + skipped,
+        "rendered": len(pending) - failed,
+        "skipped": skipped,
+        "failed": failed,
+        "watches": len(watches),
+        "seconds": round(time.perf_counter() - start, 2),
+        "manifest": str(manifest_path)
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-render try-on galleries from wrist photos")
+    parser.add_argument("source", type=Path, help="Directory of wrist photos (searched recursively)")
+    parser.add_argument("--out", type=Path, required=True, help="Output directory to publish to the CDN")
+    parser.add_argument("--watch-ids", help="Comma-separated watch IDs (default: all)")
+    parser.add_argument("--tier", help="Model tier: lite, full or full-2hands")
+    parser.add_argument("--format", choices=sorted(OUTPUT_FORMATS), default="webp")
+    parser.add_argument("--quality", type=int, default=85, help="WebP/JPEG quality")
+    parser.add_argument("--max-width", type=int, default=1600, help="Downscale wider photos; 0 keeps full size")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU quota)")
+    parser.add_argument("--force", action="store_true", help="Ignore the manifest and re-render everything")
+    parser.add_argument("--allow-mock", action="store_true",
+                        help="Render even without a hand model (mock landmarks; for testing only)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.source.is_dir():
+        parser.error(f"{args.source} is not a directory")
+    summary = run_batch(
+        args.source,
+        args.out,
+        watch_ids=[w.strip() for w in args.watch_ids.split(",")] if args.watch_ids else None,
+        tier_name=args.tier,
+        fmt=args.format,
+        quality=args.quality,
+        max_width=args.max_width,
+        workers=args.workers,
+        force=args.force,
+        allow_mock=args.allow_mock
+    )
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Per-session frame buffer pools
+Reusable arrays passed as dst=/out= so the per-frame hot loop does not
+allocate once a session's frame size has settled
+"""
+import logging
+from typing import Dict, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class BufferPool:
+    """Named scratch arrays for one session.
+
+    A buffer is (re)allocated only when the requested shape or dtype
+    changes, e.g. after a quality level or raw format change. Frames of a
+    session are processed one at a time, so buffers are never shared
+    between concurrent jobs; contents are only valid until the next frame.
+    """
+
+    def __init__(self):
+        self._buffers: Dict[str, np.ndarray] = {}
+        self.allocations = 0
+
+    def get(self, name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+            buffer = self._buffers[name] = np.empty(shape, dtype)
+            self.allocations += 1
+        return buffer
+
+    def scratch(self, name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """A view of at least `shape` on a buffer that only grows.
+        
+        For regions whose size changes every frame (e.g. hand ROIs); the
+        view is not contiguous, so use it with numpy out=, not cv2 dst=.
+        """
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.dtype != dtype or buffer.ndim != len(shape) \
+                or any(have < want for have, want in zip(buffer.shape, shape)):
+            grown = shape if buffer is None or buffer.ndim != len(shape) \
+                else tuple(max(have, want) for have, want in zip(buffer.shape, shape))
+            buffer = self._buffers[name] = np.empty(grown, dtype)
+            self.allocations += 1
+        return buffer[tuple(slice(0, n) for n in shape)]
+
+    def scratch_contiguous(self, name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """Like scratch(), but a contiguous array, usable as cv2 dst="""
+        size = int(np.prod(shape))
+        return self.scratch(name, (size,), dtype).reshape(shape)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(b.nbytes for b in self._buffers.values())
+
+    def clear(self) -> None:
+        self._buffers.clear()
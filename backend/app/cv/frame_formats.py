@@ -0,0 +1,74 @@
+"""
+Raw frame ingestion formats
+Uncompressed gray, RGBA, NV12 and I420 frames read straight from the
+WebSocket buffer with np.frombuffer, so no image codec runs per frame
+"""
+import logging
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+from pydantic import BaseModel, field_validator, model_validator
+
+from app.core import metrics
+from app.cv.buffers import BufferPool
+
+logger = logging.getLogger(__name__)
+
+MAX_RAW_DIMENSION = 1280
+
+# Format -> cvtColor code to the detector's BGR input
+BGR_CONVERSIONS: Dict[str, int] = {
+    "gray": cv2.COLOR_GRAY2BGR,
+    "rgba": cv2.COLOR_RGBA2BGR,
+    "nv12": cv2.COLOR_YUV2BGR_NV12,
+    "i420": cv2.COLOR_YUV2BGR_I420,
+}
+
+
+class RawFrameFormat(BaseModel):
+    """Fixed layout negotiated once per session (e.g. from VideoFrame.copyTo)"""
+    format: str
+    width: int
+    height: int
+
+    @field_validator('format')
+    @classmethod
+    def validate_format(cls, v):
+        v = v.lower()
+        if v not in BGR_CONVERSIONS:
+            raise ValueError(f"Unsupported raw format '{v}', expected one of {sorted(BGR_CONVERSIONS)}")
+        return v
+
+    @model_validator(mode='after')
+    def validate_size(self):
+        if not (0 < self.width <= MAX_RAW_DIMENSION and 0 < self.height <= MAX_RAW_DIMENSION):
+            raise ValueError(f"Raw frames must be at most {MAX_RAW_DIMENSION}x{MAX_RAW_DIMENSION}")
+        if self.format in ("nv12", "i420") and (self.width % 2 or self.height % 2):
+            raise ValueError("YUV 4:2:0 frames need even width and height")
+        return self
+
+    @property
+    def shape(self) -> tuple:
+        if self.format == "gray":
+            return (self.height, self.width)
+        if self.format == "rgba":
+            return (self.height, self.width, 4)
+        return (self.height * 3 // 2, self.width)  # planar Y followed by chroma
+
+    @property
+    def nbytes(self) -> int:
+        return int(np.prod(self.shape))
+
+    def to_bgr(self, buffer: bytes, buffers: Optional[BufferPool] = None) -> np.ndarray:
+        """View the buffer as pixels (no copy) and convert to the detector's BGR input
+        
+        With a buffer pool the BGR frame is written into a reused array.
+        """
+        if len(buffer) != self.nbytes:
+            raise ValueError(f"Expected {self.nbytes} bytes for {self.format} "
+                             f"{self.width}x{self.height}, got {len(buffer)}")
+        with metrics.stage("convert"):
+            pixels = np.frombuffer(buffer, np.uint8).reshape(self.shape)
+            dst = buffers.get("bgr", (self.height, self.width, 3)) if buffers is not None else None
+            return cv2.cvtColor(pixels, BGR_CONVERSIONS[self.format], dst=dst)
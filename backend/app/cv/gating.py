@@ -0,0 +1,80 @@
+"""
+Frame-difference gating
+Skips hand detection for frames that barely differ from the last detected one
+"""
+import logging
+from typing import Any, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class FrameGate:
+    """Compares a tiny grayscale thumbnail of each frame with the last processed one.
+
+    When the mean absolute difference (0-255 scale) is below `threshold`,
+    the previous detection result is reused. Detection is forced at least
+    every `refresh_every` frames so results never drift, and whenever the
+    frame's `key` (e.g. the client crop it was cut from) changes, since
+    landmarks from one crop do not apply to another.
+    """
+
+    def __init__(self, threshold: float, refresh_every: int, thumb_size: Tuple[int, int] = (32, 24)):
+        self.threshold = threshold
+        self.refresh_every = max(1, refresh_every)
+        self.thumb_size = thumb_size
+        self.last_result: Optional[Any] = None
+        self._last_thumb: Optional[np.ndarray] = None
+        self._last_key: Any = None
+        self._skipped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, self.thumb_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def should_detect(self, frame: np.ndarray, key: Any = None) -> bool:
+        """True if the frame needs a fresh detection; False to reuse last_result"""
+        if not self.enabled:
+            return True
+
+        thumb = self._thumbnail(frame)
+        if key != self._last_key:
+            self._last_key = key
+            return self._accept(thumb)
+        if (
+            self._last_thumb is None
+            or self.last_result is None
+            or self._skipped >= self.refresh_every - 1
+            or self._last_thumb.shape != thumb.shape
+        ):
+            return self._accept(thumb)
+
+        diff = float(cv2.absdiff(thumb, self._last_thumb).mean())
+        if diff >= self.threshold:
+            return self._accept(thumb)
+
+        self._skipped += 1
+        metrics.DETECTION_GATE.inc(result="reused")
+        return False
+
+    def _accept(self, thumb: np.ndarray) -> bool:
+        self._last_thumb = thumb
+        self._skipped = 0
+        metrics.DETECTION_GATE.inc(result="detected")
+        return True
+
+    def reset(self) -> None:
+        self.last_result = None
+        self._last_thumb = None
+        self._last_key = None
+        self._skipped = 0
@@ -0,0 +1,136 @@
+"""
+Hand model registry
+Resolves the landmark model files once per process and keeps their bytes
+in memory, so every landmarker is built from model_asset_buffer
+"""
+import hashlib
+import logging
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+class ModelUnavailable(RuntimeError):
+    """Raised when a required hand model cannot be loaded"""
+
+
+class ModelAsset(BaseModel):
+    """A model file read into memory"""
+    name: str
+    path: str
+    size_bytes: int
+    sha256: str
+    data: bytes
+
+    @property
+    def version(self) -> str:
+        """Content hash prefix; changes whenever the file does"""
+        return self.sha256[:12]
+
+    def info(self) -> dict:
+        return {"path": self.path, "size_bytes": self.size_bytes, "version": self.version}
+
+
+def model_search_dirs() -> List[Path]:
+    """Directories a relative model path is looked up in, in order"""
+    dirs = [Path.cwd().resolve(), BACKEND_DIR, BACKEND_DIR / "models", BACKEND_DIR / "assets" / "models"]
+    return list(dict.fromkeys(dirs))
+
+
+def resolve_model_path(path: str) -> Optional[Path]:
+    """Absolute path of an existing model file, or None"""
+    candidate = Path(os.path.expanduser(path))
+    if candidate.is_absolute():
+        return candidate if candidate.is_file() else None
+    for directory in model_search_dirs():
+        if (directory / candidate).is_file():
+            return (directory / candidate).resolve()
+    return None
+
+
+class ModelRegistry:
+    """Loads each configured model once and shares its bytes.
+
+    In strict mode (production) a missing or unreadable model raises
+    ModelUnavailable instead of letting callers fall back to mock data.
+    """
+
+    def __init__(self, paths: Dict[str, str], strict: bool = False):
+        self.paths = {name: path for name, path in paths.items() if path}
+        self.strict = strict
+        self._assets: Dict[str, Optional[ModelAsset]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[ModelAsset]:
+        """Model by name ("full", "lite"); an unconfigured lite model falls back to full
+
+        Raises:
+            ModelUnavailable: in strict mode, if the model cannot be loaded
+        """
+        if name not in self.paths and name != "full":
+            name = "full"
+        with self._lock:
+            if name not in self._assets:
+                self._assets[name] = self._load(name)
+            asset = self._assets[name]
+        if asset is None and self.strict:
+            raise ModelUnavailable(f"Hand model '{name}' is not available ({self.paths.get(name)})")
+        return asset
+
+    def _load(self, name: str) -> Optional[ModelAsset]:
+        configured = self.paths.get(name, "")
+        path = resolve_model_path(configured) if configured else None
+        if path is None:
+            searched = ", ".join(str(d) for d in model_search_dirs())
+            logger.error(f"Hand model '{name}' not found: {configured!r} (searched {searched})")
+            return None
+        try:
+            data = path.read_bytes()
+        except OSError as e:
+            logger.error(f"Could not read hand model {path}: {e}")
+            return None
+        asset = ModelAsset(
+            name=name,
+            path=str(path),
+            size_bytes=len(data),
+            sha256=hashlib.sha256(data).hexdigest(),
+            data=data
+        )
+        logger.info(f"Loaded hand model '{name}' from {path} ({asset.size_bytes} bytes, {asset.version})")
+        return asset
+
+    def preload(self) -> None:
+        """Load every configured model now, raising in strict mode if one is missing"""
+        for name in self.paths:
+            self.get(name)
+
+    def snapshot(self) -> dict:
+        """Loaded model versions and sizes for the health endpoint"""
+        with self._lock:
+            loaded = dict(self._assets)
+        models = {}
+        for name, path in self.paths.items():
+            if loaded.get(name) is not None:
+                models[name] = {**loaded[name].info(), "loaded": True}
+            else:
+                models[name] = {"path": path, "loaded": False, "missing": name in loaded}
+        return {"strict": self.strict, "models": models}
+
+
+@lru_cache()
+def get_model_registry() -> ModelRegistry:
+    settings = get_settings()
+    return ModelRegistry(
+        {"full": settings.hand_model_path, "lite": settings.hand_model_lite_path},
+        strict=settings.environment == "production"
+    )
@@ -0,0 +1,111 @@
+"""
+Client ROI hinting
+Suggests a crop around the tracked hand so clients upload less, and maps
+landmarks detected in a crop back to full-frame coordinates
+"""
+import logging
+from typing import Optional
+
+from pydantic import BaseModel, model_validator
+
+logger = logging.getLogger(__name__)
+
+
+class CropRect(BaseModel):
+    """Crop position and size, normalized to the full frame (0-1)"""
+    x: float
+    y: float
+    w: float
+    h: float
+
+    @model_validator(mode='after')
+    def validate_bounds(self):
+        if not (0 < self.w <= 1 and 0 < self.h <= 1):
+            raise ValueError("Crop width and height must be in (0, 1]")
+        if self.x < 0 or self.y < 0 or self.x + self.w > 1.001 or self.y + self.h > 1.001:
+            raise ValueError("Crop must lie inside the frame")
+        return self
+
+
+def to_full_frame(landmarks: dict, crop: CropRect) -> dict:
+    """Map crop-relative wrist landmarks to full-frame normalized coordinates"""
+    mapped = dict(landmarks)
+    mapped["wrist_x"] = crop.x + landmarks["wrist_x"] * crop.w
+    mapped["wrist_y"] = crop.y + landmarks["wrist_y"] * crop.h
+    mapped["wrist_width"] = landmarks["wrist_width"] * crop.w
+    return mapped
+
+
+class ROIHinter:
+    """Per-session crop suggestions.
+
+    The crop is `scale` wrist widths wide, centered on the wrist, and as
+    tall in pixels (using the aspect ratio of the last full frame). A full
+    frame is requested every `full_frame_every` frames, and whenever the
+    hand is lost, so new or moved hands are still found.
+
+    The suggestion is sticky: it only moves once the wrist comes within
+    `edge_margin` (fraction of the crop size) of its edge, or the wanted
+    size differs by more than `resize_tolerance`, so clients are not sent
+    a new crop on every frame.
+    """
+
+    def __init__(
+        self,
+        scale: float = 3.5,
+        full_frame_every: int = 15,
+        edge_margin: float = 0.25,
+        resize_tolerance: float = 0.1
+    ):
+        self.scale = scale
+        self.full_frame_every = max(1, full_frame_every)
+        self.edge_margin = edge_margin
+        self.resize_tolerance = resize_tolerance
+        self.aspect: Optional[float] = None  # width / height of the last full frame
+        self._since_full = 0
+        self._landmarks: Optional[dict] = None
+        self._crop: Optional[dict] = None
+
+    def observe_frame(self, width: int, height: int, crop: Optional[CropRect]) -> None:
+        """Called on the CV worker with the size of each decoded frame"""
+        if crop is None:
+            self.aspect = width / height
+        elif height:
+            self.aspect = (width / crop.w) / (height / crop.h)
+
+    def observe(self, result: dict, crop: Optional[CropRect]) -> None:
+        """Track full-frame landmarks from a detection result"""
+        self._since_full = 0 if crop is None else self._since_full + 1
+        if result.get("hands_detected") and result.get("landmarks"):
+            self._landmarks = result["landmarks"]
+        else:
+            self._landmarks = None
+
+    @property
+    def wants_full_frame(self) -> bool:
+        return self.suggest() is None
+
+    def suggest(self) -> Optional[dict]:
+        """Crop for the client's next frame, or None to request a full frame"""
+        if self._landmarks is None or self.aspect is None or self._since_full + 1 >= self.full_frame_every:
+            self._crop = None
+            return None
+        w = min(1.0, self._landmarks["wrist_width"] * self.scale)
+        if self._crop is not None and self._holds(self._crop, w):
+            return self._crop
+        h = min(1.0, w * self.aspect)
+        x = min(max(self._landmarks["wrist_x"] - w / 2, 0.0), 1.0 - w)
+        y = min(max(self._landmarks["wrist_y"] - h / 2, 0.0), 1.0 - h)
+        self._crop = {"x": round(x, 4), "y": round(y, 4), "w": round(w, 4), "h": round(h, 4)}
+        return self._crop
+
+    def _holds(self, crop: dict, w: float) -> bool:
+        """True if the current crop still frames the wrist well enough to keep"""
+        if abs(w - crop["w"]) > self.resize_tolerance * crop["w"]:
+            return False
+        wx, wy = self._landmarks["wrist_x"], self._landmarks["wrist_y"]
+        mx, my = crop["w"] * self.edge_margin, crop["h"] * self.edge_margin
+        return (
+            crop["x"] + mx <= wx <= crop["x"] + crop["w"] - mx
+            and crop["y"] + my <= wy <= crop["y"] + crop["h"] - my
+        )
@@ -0,0 +1,167 @@
+"""
+Motion-predicted wrist landmarks
+Constant-velocity filtering of past detections so the detector can run
+only every Nth frame, with N adapted to load and prediction error
+"""
+import logging
+import math
+from typing import Dict, List, Optional, Tuple
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+TRACKED_KEYS = ("wrist_x", "wrist_y", "wrist_width", "rotation")
+
+
+class AlphaBetaFilter:
+    """Steady-state constant-velocity Kalman (alpha-beta) filter for one value"""
+
+    def __init__(self, alpha: float = 0.6, beta: float = 0.2, period: Optional[float] = None):
+        self.alpha = alpha
+        self.beta = beta
+        self.period = period  # wrap-around period for angles
+        self.value: Optional[float] = None
+        self.velocity = 0.0
+
+    def _residual(self, measured: float, predicted: float) -> float:
+        r = measured - predicted
+        if self.period:
+            half = self.period / 2
+            r = (r + half) % self.period - half
+        return r
+
+    def predict(self, dt: float) -> float:
+        return self.value + self.velocity * dt
+
+    def update(self, measured: float, dt: float) -> None:
+        if self.value is None:
+            self.value = measured
+            self.velocity = 0.0
+            return
+        predicted = self.predict(dt)
+        r = self._residual(measured, predicted)
+        self.value = predicted + self.alpha * r
+        if dt > 0:
+            self.velocity += self.beta * r / dt
+
+
+class HandTrack:
+    """Filters for one tracked hand"""
+
+    def __init__(self, landmarks: dict):
+        self.handedness: Optional[str] = landmarks.get("handedness")
+        self.filters: Dict[str, AlphaBetaFilter] = {
+            key: AlphaBetaFilter(period=360.0 if key == "rotation" else None)
+            for key in TRACKED_KEYS
+        }
+        for key, f in self.filters.items():
+            f.update(float(landmarks[key]), 0.0)
+
+    def predict(self, dt: float) -> dict:
+        landmarks = {key: f.predict(dt) for key, f in self.filters.items()}
+        landmarks["rotation"] = landmarks["rotation"] % 360.0
+        if self.handedness is not None:
+            landmarks["handedness"] = self.handedness
+        return landmarks
+
+    def update(self, landmarks: dict, dt: float) -> None:
+        for key, f in self.filters.items():
+            f.update(float(landmarks[key]), dt)
+
+
+class MotionTracker:
+    """Decides when to run the detector and predicts landmarks in between.
+
+    Each detected hand has its own filters; detections are matched to
+    tracks by handedness, else by nearest wrist. A change in the number
+    of hands restarts tracking.
+
+    The detection interval N grows with CV queue pressure (0 = workers
+    keeping up, 1 = saturated) up to `max_interval`, and is capped while
+    the measured prediction error, relative to wrist width, exceeds
+    `error_budget`.
+    """
+
+    def __init__(self, max_interval: int = 3, error_budget: float = 0.15):
+        self.max_interval = max(1, max_interval)
+        self.error_budget = error_budget
+        self.interval = 1
+        self.error = 0.0  # EWMA of relative prediction error (worst hand)
+        self._error_cap = self.max_interval
+        self._tracks: List[HandTrack] = []
+        self._last_time: Optional[float] = None
+        self._since_detection = 0
+
+    def reset(self) -> None:
+        self._tracks = []
+        self._last_time = None
+        self._since_detection = 0
+
+    @property
+    def tracking(self) -> bool:
+        return self._last_time is not None
+
+    def adapt(self, pressure: float) -> None:
+        """Set N from current CV load, capped by recent prediction error"""
+        wanted = 1 + round(max(0.0, min(1.0, pressure)) * (self.max_interval - 1))
+        self.interval = max(1, min(wanted, self._error_cap))
+
+    def should_detect(self) -> bool:
+        return not self.tracking or self._since_detection + 1 >= self.interval
+
+    def predict(self, now: float) -> List[dict]:
+        """Landmarks of every tracked hand, extrapolated to `now`"""
+        dt = now - self._last_time
+        self._since_detection += 1
+        metrics.DETECTION_GATE.inc(result="predicted")
+        return [track.predict(dt) for track in self._tracks]
+
+    def _match(self, hands: List[dict], dt: float) -> List[Tuple[HandTrack, dict]]:
+        """Pair detected hands with tracks: by handedness when it is unambiguous, else nearest wrist"""
+        sides = [h.get("handedness") for h in hands]
+        tracked = [t.handedness for t in self._tracks]
+        if None not in sides and len(set(sides)) == len(sides) and sorted(sides) == sorted(tracked):
+            by_side = {t.handedness: t for t in self._tracks}
+            return [(by_side[h["handedness"]], h) for h in hands]
+        predicted = [t.predict(dt) for t in self._tracks]
+        pairs = sorted(
+            (math.hypot(p["wrist_x"] - h["wrist_x"], p["wrist_y"] - h["wrist_y"]), ti, hi)
+            for ti, p in enumerate(predicted) for hi, h in enumerate(hands)
+        )
+        used_tracks, used_hands, matches = set(), set(), []
+        for _, ti, hi in pairs:
+            if ti in used_tracks or hi in used_hands:
+                continue
+            used_tracks.add(ti)
+            used_hands.add(hi)
+            matches.append((self._tracks[ti], hands[hi]))
+        return matches
+
+    def observe(self, result: dict, now: float) -> None:
+        """Feed a detector result; measures prediction error before updating"""
+        hands = (result.get("hands") or [result.get("landmarks")]) if result.get("hands_detected") else []
+        if not hands or any(not h or any(key not in h for key in TRACKED_KEYS) for h in hands):
+            self.reset()
+            return
+
+        if not self.tracking or len(hands) != len(self._tracks):
+            self._tracks = [HandTrack(h) for h in hands]
+        else:
+            dt = now - self._last_time
+            error = 0.0
+            for track, landmarks in self._match(hands, dt):
+                px = track.filters["wrist_x"].predict(dt)
+                py = track.filters["wrist_y"].predict(dt)
+                width = max(landmarks["wrist_width"], 0.02)
+                error = max(error, math.hypot(px - landmarks["wrist_x"], py - landmarks["wrist_y"]) / width)
+                track.update(landmarks, dt)
+                if landmarks.get("handedness") is not None:
+                    track.handedness = landmarks["handedness"]
+            self.error = 0.7 * self.error + 0.3 * error
+            if self.error > self.error_budget:
+                self._error_cap = max(1, self._error_cap - 1)
+            elif self.error < self.error_budget / 2:
+                self._error_cap = min(self.max_interval, self._error_cap + 1)
+        self._last_time = now
+        self._since_detection = 0
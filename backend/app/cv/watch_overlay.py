@@ -3,23 +3,46 @@ Watch overlay on wrist using perspective transformation
 """
 import logging
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, NamedTuple, Optional, Tuple
 
 import cv2
 import numpy as np
 
+from app.core import metrics
+from app.cv.buffers import BufferPool
+
 logger = logging.getLogger(__name__)
 
+# Blend watches one by one once their union box exceeds this multiple of their combined area
+SEPARATE_BLEND_RATIO = 2.0
+
+
+class Placement(NamedTuple):
+    """Where one watch goes, in frame pixels"""
+    center_x: float
+    center_y: float
+    width: float  # watch width
+    angle: float  # degrees, as for cv2.getRotationMatrix2D
+
+
+def placement_from_wrist(wrist: dict, frame_shape: Tuple[int, ...]) -> Placement:
+    """Placement from normalized WatchTryOn landmarks (wrist_x, wrist_y, wrist_width, rotation)"""
+    h, w = frame_shape[:2]
+    return Placement(wrist["wrist_x"] * w, wrist["wrist_y"] * h, wrist["wrist_width"] * w, wrist["rotation"])
+
 
 class WatchOverlay:
-    """Overlays a watch image on detected wrist"""
+    """Overlays a watch image on detected wrists"""
     
-    def __init__(self, watch_image_path: str):
+    def __init__(self, watch_image_path: str, watch_img: Optional[np.ndarray] = None):
         """
         Args:
             watch_image_path: Path to PNG watch image (with transparency)
+            watch_img: Already loaded BGR/BGRA image; skips reading the path
         """
-        self.watch_img = self._load_watch_image(watch_image_path)
+        if watch_img is not None and watch_img.ndim == 3 and watch_img.shape[2] == 3:
+            watch_img = cv2.cvtColor(watch_img, cv2.COLOR_BGR2BGRA)
+        self.watch_img = watch_img if watch_img is not None else self._load_watch_image(watch_image_path)
         if self.watch_img is None:
             raise ValueError(f"Could not load watch image: {watch_image_path}")
         
@@ -42,86 +65,175 @@ class WatchOverlay:
             logger.error(f"Error loading watch image: {e}")
             return None
     
-    def apply(self, frame: np.ndarray, hand_data: dict) -> np.ndarray:
+    def placement(self, hand_data: dict) -> Placement:
+        """Placement from HandDetector pixel landmarks"""
+        landmarks = hand_data["landmarks"]
+        
+        # Key points: wrist (0), thumb base (1), middle finger base (9), pinky base (17)
+        wrist_pt = np.array(landmarks[0], dtype=np.float32)
+        thumb_base = np.array(landmarks[1], dtype=np.float32)
+        pinky_base = np.array(landmarks[17], dtype=np.float32)
+        middle_base = np.array(landmarks[9], dtype=np.float32)
+        
+        # Watch is 80% of hand width, centered on the wrist, pointing along the hand
+        hand_width = float(np.linalg.norm(thumb_base - pinky_base))
+        angle = np.arctan2(middle_base[1] - wrist_pt[1], middle_base[0] - wrist_pt[0])
+        center_x, center_y = hand_data["wrist"]
+        return Placement(float(center_x), float(center_y), hand_width * 0.8, float(np.degrees(angle)) - 90)
+    
+    def apply(self, frame: np.ndarray, hand_data: dict, buffers: Optional[BufferPool] = None) -> np.ndarray:
         """
         Apply watch overlay on wrist
         
         Args:
             frame: Input frame (BGR)
             hand_data: Dict with 'wrist' and 'landmarks' from HandDetector
+            buffers: Session buffer pool for the warp and blend scratch arrays
         
         Returns:
             Frame with watch overlaid
         """
         try:
-            wrist = hand_data["wrist"]
-            landmarks = hand_data["landmarks"]
-            
-            # Get key points for perspective transform
-            # We'll use wrist (0), thumb base (1), pinky base (17), and middle finger base (9)
-            wrist_pt = np.array(landmarks[0], dtype=np.float32)
-            thumb_base = np.array(landmarks[1], dtype=np.float32)
-            pinky_base = np.array(landmarks[17], dtype=np.float32)
-            middle_base = np.array(landmarks[9], dtype=np.float32)
-            
-            # Calculate watch size based on hand size
-            hand_width = np.linalg.norm(thumb_base - pinky_base)
-            watch_scale = hand_width * 0.8  # Watch is 80% of hand width
-            
-            # Calculate watch position (centered on wrist)
-            center_x, center_y = wrist
-            
-            # Calculate rotation angle
-            angle = np.arctan2(middle_base[1] - wrist_pt[1], middle_base[0] - wrist_pt[0])
-            angle_deg = np.degrees(angle) - 90  # Adjust for vertical orientation
-            
-            # Create rotation matrix
-            watch_center = (self.watch_w // 2, self.watch_h // 2)
-            rot_matrix = cv2.getRotationMatrix2D(watch_center, angle_deg, watch_scale / self.watch_w)
-            
-            # Adjust translation
-            rot_matrix[0, 2] += center_x - watch_center[0]
-            rot_matrix[1, 2] += center_y - watch_center[1]
-            
-            # Warp watch image
-            rotated_watch = cv2.warpAffine(
-                self.watch_img,
-                rot_matrix,
-                (frame.shape[1], frame.shape[0]),
-                flags=cv2.INTER_LINEAR,
-                borderMode=cv2.BORDER_CONSTANT,
-                borderValue=(0, 0, 0, 0)
-            )
-            
-            # Blend with original frame using alpha channel
-            frame = self._blend_transparent(frame, rotated_watch)
-            
-            return frame
-            
+            placement = self.placement(hand_data)
         except Exception as e:
             logger.error(f"Overlay error: {e}")
             return frame
+        return self.apply_many(frame, [placement], buffers)
+    
+    def apply_many(
+        self,
+        frame: np.ndarray,
+        placements: List[Placement],
+        buffers: Optional[BufferPool] = None
+    ) -> np.ndarray:
+        """
+        Draw a watch for every placement in one blend over the union of their regions
+        
+        Each watch is warped only into its own bounding box, so cost grows
+        with the covered area rather than hands times frame size. Watches far
+        apart (union box over SEPARATE_BLEND_RATIO times their combined area,
+        boxes not overlapping) are blended one by one instead.
+        
+        Returns:
+            Frame with watches overlaid (modified in place)
+        """
+        with metrics.stage("overlay"):
+            try:
+                return self._apply_many(frame, placements, buffers or BufferPool())
+            except Exception as e:
+                logger.error(f"Overlay error: {e}")
+                return frame
+    
+    def _warp_matrix(self, placement: Placement) -> np.ndarray:
+        watch_center = (self.watch_w // 2, self.watch_h // 2)
+        matrix = cv2.getRotationMatrix2D(watch_center, placement.angle, placement.width / self.watch_w)
+        matrix[0, 2] += placement.center_x - watch_center[0]
+        matrix[1, 2] += placement.center_y - watch_center[1]
+        return matrix
+    
+    def _bounds(self, matrix: np.ndarray, frame_shape: Tuple[int, ...]) -> Optional[Tuple[int, int, int, int]]:
+        """Frame-clipped (x0, y0, x1, y1) box covered by the warped watch, or None if off-frame"""
+        corners = np.array(
+            [[0, 0, 1], [self.watch_w, 0, 1], [self.watch_w, self.watch_h, 1], [0, self.watch_h, 1]],
+            dtype=np.float64
+        ) @ matrix.T
+        x0, y0 = np.floor(corners.min(axis=0)).astype(int) - 1
+        x1, y1 = np.ceil(corners.max(axis=0)).astype(int) + 1
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, frame_shape[1]), min(y1, frame_shape[0])
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return x0, y0, x1, y1
+    
+    def _apply_many(self, frame: np.ndarray, placements: List[Placement], buffers: BufferPool) -> np.ndarray:
+        boxes = []
+        for placement in placements:
+            if placement.width <= 0:
+                continue
+            matrix = self._warp_matrix(placement)
+            box = self._bounds(matrix, frame.shape)
+            if box is not None:
+                boxes.append((matrix, box))
+        if not boxes:
+            return frame
+        
+        if len(boxes) > 1 and self._blend_separately([box for _, box in boxes]):
+            for matrix, (x0, y0, x1, y1) in boxes:
+                layer = buffers.scratch("layer", (y1 - y0, x1 - x0, 4))
+                layer.fill(0)
+                self._warp_into(layer, matrix, x0, y0, buffers)
+                self._blend_transparent(frame[y0:y1, x0:x1], layer, buffers)
+            return frame
+        
+        ux0 = min(b[0] for _, b in boxes)
+        uy0 = min(b[1] for _, b in boxes)
+        ux1 = max(b[2] for _, b in boxes)
+        uy1 = max(b[3] for _, b in boxes)
+        layer = buffers.scratch("layer", (uy1 - uy0, ux1 - ux0, 4))
+        layer.fill(0)
+        
+        for matrix, (x0, y0, x1, y1) in boxes:
+            self._warp_into(layer[y0 - uy0:y1 - uy0, x0 - ux0:x1 - ux0], matrix, x0, y0, buffers)
+        
+        self._blend_transparent(frame[uy0:uy1, ux0:ux1], layer, buffers)
+        return frame
+    
+    @staticmethod
+    def _blend_separately(boxes: List[Tuple[int, int, int, int]]) -> bool:
+        """True if the union box would mostly blend untouched pixels between disjoint watches"""
+        area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in boxes)
+        union = (max(b[2] for b in boxes) - min(b[0] for b in boxes)) * \
+            (max(b[3] for b in boxes) - min(b[1] for b in boxes))
+        if union <= SEPARATE_BLEND_RATIO * area:
+            return False
+        # Overlapping watches need the shared layer to keep the more opaque pixel
+        return not any(
+            a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+            for i, a in enumerate(boxes) for b in boxes[i + 1:]
+        )
+    
+    def _warp_into(self, region: np.ndarray, matrix: np.ndarray, x0: int, y0: int, buffers: BufferPool) -> None:
+        """Warp the watch into its box (region, at frame offset x0, y0), keeping
+        the more opaque pixel where a watch is already drawn; shifts matrix in place"""
+        matrix[0, 2] -= x0
+        matrix[1, 2] -= y0
+        h, w = region.shape[:2]
+        warped = cv2.warpAffine(
+            self.watch_img,
+            matrix,
+            (w, h),
+            dst=buffers.scratch_contiguous("warped", (h, w, 4)),
+            flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_CONSTANT,
+            borderValue=(0, 0, 0, 0)
+        )
+        mask = np.greater(warped[:, :, 3:], region[:, :, 3:], out=buffers.scratch("warp_mask", (h, w, 1), np.bool_))
+        np.copyto(region, warped, where=mask)
     
-    def _blend_transparent(self, background: np.ndarray, overlay: np.ndarray) -> np.ndarray:
-        """Blend overlay with alpha channel onto background"""
+    def _blend_transparent(
+        self,
+        background: np.ndarray,
+        overlay: np.ndarray,
+        buffers: Optional[BufferPool] = None
+    ) -> np.ndarray:
+        """Blend overlay with alpha channel onto background, in place"""
         try:
-            # Extract alpha channel
-            if overlay.shape[2] == 4:
-                alpha = overlay[:, :, 3] / 255.0
-                overlay_rgb = overlay[:, :, :3]
-            else:
+            if overlay.shape[2] != 4:
                 return background
             
             # Ensure same dimensions
             if background.shape[:2] != overlay.shape[:2]:
                 return background
             
-            # Blend
-            for c in range(3):
-                background[:, :, c] = (
-                    alpha * overlay_rgb[:, :, c] +
-                    (1 - alpha) * background[:, :, c]
-                )
+            # background += alpha * (overlay - background), in float32 scratch buffers
+            buffers = buffers or BufferPool()
+            alpha = buffers.scratch("alpha", overlay.shape[:2] + (1,), np.float32)
+            blend = buffers.scratch("blend", background.shape, np.float32)
+            np.multiply(overlay[:, :, 3:], np.float32(1 / 255), out=alpha)
+            np.subtract(overlay[:, :, :3], background, out=blend, dtype=np.float32)
+            np.multiply(blend, alpha, out=blend)
+            np.add(blend, background, out=blend)
+            np.copyto(background, blend, casting='unsafe')
             
             return background
         except Exception as e:
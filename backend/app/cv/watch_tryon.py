@@ -1,36 +1,84 @@
 import logging
+import math
+import threading
+import weakref
 import cv2
+import mediapipe as mp
 import numpy as np
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
 
+from app.core import metrics
+from app.core.tiers import ModelTier, get_tier
+from app.cv.buffers import BufferPool
+from app.cv.models import get_model_registry
+from app.cv.watch_overlay import WatchOverlay, placement_from_wrist
+
 logger = logging.getLogger(__name__)
 
 
 class WatchTryOn:
     
+    # Every live instance, so shutdown can close their landmarkers deterministically
+    _instances: "weakref.WeakSet[WatchTryOn]" = weakref.WeakSet()
+    
     def __init__(self, watch_image_path: str):
+        WatchTryOn._instances.add(self)
         self.watch_image_path = watch_image_path
         self.watch_image = None
         
-        # Initialize hand landmarker with new MediaPipe Tasks API
-        try:
-            base_options = python.BaseOptions(model_asset_path='hand_landmarker.task')
-            options = vision.HandLandmarkerOptions(
-                base_options=base_options,
-                num_hands=2,
-                min_hand_detection_confidence=0.5,
-                min_hand_presence_confidence=0.5,
-                min_tracking_confidence=0.5
-            )
-            self.detector = vision.HandLandmarker.create_from_options(options)
-            logger.info("Hand landmarker initialized with Tasks API")
-        except Exception as e:
-            self.detector = None
-            logger.error(f"Failed to initialize hand landmarker: {e}")
+        # Hand landmarkers per worker thread and (model, num_hands), created on
+        # first use: a HandLandmarker is not safe to call from several threads
+        self._local = threading.local()
+        self._detectors: List[vision.HandLandmarker] = []
+        self._generation = 0
+        self._detectors_lock = threading.Lock()
+        self.detector = self._get_detector(get_tier())
         
         self._load_watch_image()
+        self.overlay = WatchOverlay(self.watch_image_path, self.watch_image)
+    
+    def _get_detector(self, tier: ModelTier) -> Optional[vision.HandLandmarker]:
+        """Landmarker for a tier with the new MediaPipe Tasks API; None if unavailable
+        
+        Raises:
+            ModelUnavailable: in production, instead of falling back to mock data
+        """
+        key = (tier.model, tier.num_hands)
+        if getattr(self._local, "generation", None) != self._generation:
+            self._local.detectors = {}
+            self._local.generation = self._generation
+        detectors: Dict[Tuple[str, int], Optional[vision.HandLandmarker]] = self._local.detectors
+        if key in detectors:
+            return detectors[key]
+        with self._detectors_lock:
+            registry = get_model_registry()
+            asset = registry.get(tier.model)
+            if asset is None:
+                detectors[key] = None
+                return None
+            try:
+                # Built from the registry's shared bytes; the file is read once per process
+                base_options = python.BaseOptions(model_asset_buffer=asset.data)
+                options = vision.HandLandmarkerOptions(
+                    base_options=base_options,
+                    num_hands=tier.num_hands,
+                    min_hand_detection_confidence=0.5,
+                    min_hand_presence_confidence=0.5,
+                    min_tracking_confidence=0.5
+                )
+                detector = vision.HandLandmarker.create_from_options(options)
+                logger.info(f"Hand landmarker initialized with Tasks API ({tier.name}, model {asset.version})")
+            except Exception as e:
+                if registry.strict:
+                    raise
+                detector = None
+                logger.error(f"Failed to initialize hand landmarker: {e}")
+            if detector is not None:
+                self._detectors.append(detector)
+            detectors[key] = detector
+            return detector
     
     def _load_watch_image(self) -> None:
         """Load watch image with error handling"""
@@ -66,47 +114,89 @@ class WatchTryOn:
             self.watch_image[:, :, 3] = 255
     
     
-    def process_frame(self, frame: np.ndarray) -> Dict[str, any]:
+    def process_frame(
+        self,
+        frame: np.ndarray,
+        buffers: Optional[BufferPool] = None,
+        tier: Optional[ModelTier] = None
+    ) -> Dict[str, any]:
         """Process frame and return wrist landmarks for frontend overlay.
         
         Args:
             frame: BGR image as NumPy array
+            buffers: Session buffer pool for the RGB conversion
+            tier: Model tier to detect with (default from settings)
             
         Returns:
-            Dict with landmarks (wrist position, width, rotation) or 'hands_detected': False
+            Dict with 'hands' (wrist position, width, rotation and handedness
+            per detected hand), 'landmarks' (the first hand, for older
+            clients) or 'hands_detected': False
         """
-        # For now, return mock data until we have MediaPipe model file
-        # TODO: Implement proper hand detection with MediaPipe Tasks API
-        # This will require downloading hand_landmarker.task model
-        
-        if self.detector is None:
+        with metrics.stage("detect"):
+            return self._detect(frame, buffers, tier or get_tier())
+    
+    def render(self, frame: np.ndarray, result: dict, buffers: Optional[BufferPool] = None) -> np.ndarray:
+        """Draw the watch on every detected hand in one pass (modifies frame)"""
+        hands = result.get("hands") or ([result["landmarks"]] if result.get("landmarks") else [])
+        if not hands:
+            return frame
+        placements = [placement_from_wrist(hand, frame.shape) for hand in hands]
+        return self.overlay.apply_many(frame, placements, buffers)
+    
+    @staticmethod
+    def _wrist_from_landmarks(hand: list, width: int, height: int) -> dict:
+        """Normalized wrist placement from 21 normalized hand landmarks"""
+        wrist, thumb_base, middle_base, pinky_base = hand[0], hand[1], hand[9], hand[17]
+        # Same geometry as WatchOverlay.placement: 80% of hand width, along the hand
+        hand_width = math.hypot((thumb_base.x - pinky_base.x) * width, (thumb_base.y - pinky_base.y) * height)
+        angle = math.degrees(math.atan2(
+            (middle_base.y - wrist.y) * height, (middle_base.x - wrist.x) * width
+        )) - 90
+        return {
+            "wrist_x": wrist.x,
+            "wrist_y": wrist.y,
+            "wrist_width": hand_width * 0.8 / width,
+            "rotation": angle % 360
+        }
+    
+    def _detect(self, frame: np.ndarray, buffers: Optional[BufferPool], tier: ModelTier) -> Dict[str, any]:
+        detector = self._get_detector(tier)
+        if detector is None:
             logger.debug("Hand detector not initialized - returning mock data")
             # Return mock data centered on frame for testing
-            return {
-                "hands_detected": True,
-                "landmarks": {
-                    "wrist_x": 0.5,  # Center X (normalized 0-1)
-                    "wrist_y": 0.6,  # Slightly below center
-                    "wrist_width": 0.15,  # 15% of frame width
-                    "rotation": 0.0  # No rotation
-                }
+            landmarks = {
+                "wrist_x": 0.5,  # Center X (normalized 0-1)
+                "wrist_y": 0.6,  # Slightly below center
+                "wrist_width": 0.15,  # 15% of frame width
+                "rotation": 0.0  # No rotation
             }
+            return {"hands_detected": True, "landmarks": landmarks, "hands": [landmarks]}
         
         try:
-            # TODO: Convert frame to MediaPipe Image format
-            # mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-            # result = self.detector.detect(mp_image)
+            # Landmarks are normalized, so cheaper tiers can detect on a downscaled frame
+            height, width = frame.shape[:2]
+            if tier.max_input_width and width > tier.max_input_width:
+                size = (tier.max_input_width, round(height * tier.max_input_width / width))
+                frame = cv2.resize(
+                    frame, size, interpolation=cv2.INTER_AREA,
+                    dst=buffers.get("tier_input", (size[1], size[0], 3)) if buffers is not None else None
+                )
+            rgb = cv2.cvtColor(
+                frame, cv2.COLOR_BGR2RGB,
+                dst=buffers.get("rgb", frame.shape) if buffers is not None else None
+            )
+            result = detector.detect(mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb))
+            if not result.hand_landmarks:
+                return {"hands_detected": False}
             
-            # TODO: Extract hand landmarks from result
-            # if result.hand_landmarks:
-            #     hand = result.hand_landmarks[0]
-            #     wrist = hand[0]  # Wrist is landmark 0
-            #     ...
+            hands: List[dict] = []
+            for i, hand in enumerate(result.hand_landmarks):
+                wrist = self._wrist_from_landmarks(hand, width, height)
+                if i < len(result.handedness) and result.handedness[i]:
+                    wrist["handedness"] = result.handedness[i][0].category_name
+                hands.append(wrist)
             
-            # For now, return no hands detected
-            return {
-                "hands_detected": False
-            }
+            return {"hands_detected": True, "landmarks": hands[0], "hands": hands}
             
         except Exception as e:
             logger.error(f"Error processing frame: {e}")
@@ -115,10 +205,28 @@ class WatchTryOn:
                 "error": str(e)
             }
     
+    def close(self) -> None:
+        """Close the MediaPipe landmarkers of every thread now; later frames recreate them on demand"""
+        lock = getattr(self, "_detectors_lock", None)
+        if lock is None:
+            return
+        with lock:
+            detectors = list(self._detectors)
+            self._detectors.clear()
+            self._generation += 1
+        for detector in detectors:
+            try:
+                if detector:
+                    detector.close()
+            except Exception:
+                pass
+    
+    @classmethod
+    def close_all(cls) -> None:
+        """Close the landmarkers of every live instance (shutdown)"""
+        for tryon in list(cls._instances):
+            tryon.close()
+    
     def __del__(self):
         """Clean up MediaPipe resources on deletion"""
-        try:
-            if self.detector:
-                self.detector.close()
-        except Exception:
-            pass
+        self.close()
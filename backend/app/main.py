@@ -1,12 +1,20 @@
+import asyncio
 import logging
+import time
 from contextlib import asynccontextmanager
 from datetime import datetime
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from app.core.config import get_settings
-from app.api import auth, tryon, cart, recommendations, watches, contact
+from app.core.admission import get_cv_admission
+from app.core import metrics, profiling
+from app.core.runtime import get_runtime_plan
+from app.core.sessions import get_session_registry
+from app.cv.models import get_model_registry
+from app.cv.watch_tryon import WatchTryOn
+from app.api import auth, tryon, jobs, cart, recommendations, watches, contact, debug
 
 logging.basicConfig(
     level=logging.INFO,
@@ -17,14 +25,48 @@ logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
+async def drain() -> None:
+    """Turn new try-on sessions away, ask connected clients to reconnect with
+    jittered backoff and give in-flight CV jobs until the drain deadline.
+
+    Run before the server closes its connections (app.serve), and again from
+    the lifespan shutdown, where it returns at once if nothing is left.
+    """
+    timeout = settings.shutdown_drain_seconds
+    registry = get_session_registry()
+    tasks = [registry.drain(timeout)]
+    if get_cv_admission.cache_info().currsize:
+        tasks.append(get_cv_admission().drain(timeout))
+    await asyncio.gather(*tasks)
+
+
+def close_cv_resources() -> None:
+    """Stop worker pools and close hand landmarkers deterministically"""
+    if jobs.get_render_jobs.cache_info().currsize:
+        jobs.get_render_jobs().shutdown()
+    if get_cv_admission.cache_info().currsize:
+        get_cv_admission().shutdown()
+    WatchTryOn.close_all()
+    tryon.get_watch_tryon.cache_clear()
+    logger.info("CV workers and hand landmarkers closed")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info(f"Starting {settings.app_name} v{settings.app_version}")
     logger.info(f"Debug mode: {settings.debug}")
     logger.info(f"CORS origins: {settings.cors_origins}")
     logger.info(f"Server will listen on {settings.host}:{settings.port}")
+    # Refuse to start in production without the hand models instead of serving mock landmarks
+    get_model_registry().preload()
+    # Size CV workers and library threads before the first frame; may self-tune for a few seconds
+    await asyncio.to_thread(get_runtime_plan)
+    reaper = asyncio.create_task(get_session_registry().run_reaper())
     yield
     logger.info("Shutting down gracefully...")
+    reaper.cancel()
+    await drain()
+    close_cv_resources()
 
 
 app = FastAPI(
@@ -44,12 +86,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.metrics_enabled:
+    @app.middleware("http")
+    async def record_request_latency(request: Request, call_next):
+        started = time.perf_counter()
+        response = await call_next(request)
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=response.status_code
+        )
+        return response
+
+if debug.profiling_available():
+    @app.middleware("http")
+    async def profile_single_request(request: Request, call_next):
+        if request.headers.get("x-profile", "").lower() not in ("1", "true") \
+                or not debug.is_admin_key(request.headers.get("x-admin-key")):
+            return await call_next(request)
+        profile = profiling.start_request_profile()
+        response = await call_next(request)
+        if profile.captured:
+            profiling.store_profile(profile)
+            response.headers["X-Profile-Id"] = profile.profile_id
+        return response
+
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(tryon.router, prefix="/api/tryon", tags=["Try-On"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Render Jobs"])
 app.include_router(cart.router, prefix="/api/cart", tags=["Cart"])
 app.include_router(recommendations.router, prefix="/api/recommendations", tags=["Recommendations"])
 app.include_router(contact.router, prefix="/api", tags=["Contact"])
 app.include_router(watches.router, prefix="/api/watches", tags=["Watches"])
+if debug.profiling_available():
+    app.include_router(debug.router, prefix="/api/debug", tags=["Debug"])
 
 
 @app.exception_handler(RequestValidationError)
@@ -84,10 +156,23 @@ async def health_check():
     return {
         "status": "healthy",
         "version": settings.app_version,
-        "timestamp": datetime.utcnow().isoformat() + "Z"
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "cv_admission": get_cv_admission().snapshot(),
+        "hand_models": get_model_registry().snapshot(),
+        "runtime": get_runtime_plan().model_dump(exclude={"trials"}),
+        "ws_sessions": get_session_registry().snapshot()
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text exposition of try-on and CV worker metrics"""
+    if not settings.metrics_enabled:
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Not Found"})
+    get_cv_admission()  # make sure the worker pool collector is registered
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
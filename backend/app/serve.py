@@ -0,0 +1,43 @@
+"""
+Production server entry point
+Runs uvicorn with a drain phase before it closes connections, so try-on
+clients are told to reconnect with backoff instead of being cut off
+"""
+import logging
+from typing import List, Optional
+
+import uvicorn
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn closes open WebSockets (1012) before the lifespan shutdown
+    runs; draining here first lets sessions and in-flight frames finish"""
+
+    async def shutdown(self, sockets: Optional[List] = None) -> None:
+        from app.main import drain
+
+        try:
+            await drain()
+        except Exception as e:
+            logger.error(f"Drain failed: {e}")
+        await super().shutdown(sockets=sockets)
+
+
+def main() -> None:
+    settings = get_settings()
+    config = uvicorn.Config(
+        "app.main:app",
+        host=settings.host,
+        port=settings.port,
+        log_level="info",
+        timeout_graceful_shutdown=int(settings.shutdown_drain_seconds) + 5
+    )
+    DrainingServer(config).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Benchmarks and load tools for the try-on backend
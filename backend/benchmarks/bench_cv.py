@@ -0,0 +1,296 @@
+"""
+CV micro-benchmarks for the try-on hot path
+
+Times the pipeline pieces on synthetic frames at 480p, 720p and 1080p and
+writes JSON that can be compared across commits.
+
+Usage (from backend/):
+    python -m benchmarks.bench_cv --out bench.json
+    python -m benchmarks.bench_cv --out new.json --compare bench.json --threshold 0.15
+    python -m benchmarks.bench_cv --recording recordings/session.tryrec
+    python -m benchmarks.bench_cv --allocations --only pooled
+"""
+import argparse
+import gc
+import json
+import logging
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+WATCH_IMAGE = BACKEND_DIR / "assets" / "watches" / "Speedmaster.png"
+
+RESOLUTIONS = {
+    "480p": (640, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+}
+
+
+def synthetic_frame(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """Noisy background with a skin-toned forearm blob, BGR uint8"""
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (0, 0), 3)
+    center = (width // 2, int(height * 0.6))
+    axes = (width // 8, height // 3)
+    cv2.ellipse(frame, center, axes, 75, 0, 360, (140, 170, 220), -1)
+    return frame
+
+
+def synthetic_hand(width: int, height: int) -> dict:
+    """HandDetector-style landmarks: 21 pixel points around the wrist"""
+    wrist = (width // 2, int(height * 0.6))
+    span = width // 10
+    landmarks = [wrist] * 21
+    landmarks[1] = (wrist[0] - span, wrist[1] - span)
+    landmarks[9] = (wrist[0], wrist[1] - 2 * span)
+    landmarks[17] = (wrist[0] + span, wrist[1] - span)
+    return {"wrist": wrist, "landmarks": landmarks, "handedness": "Right"}
+
+
+def time_call(fn: Callable[[], object], iterations: int, warmup: int) -> Dict[str, float]:
+    """Run fn repeatedly and summarize wall time in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    samples: List[float] = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "min_ms": round(samples[0], 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+    }
+
+
+def measure_allocations(fn: Callable[[], object], iterations: int) -> Dict[str, float]:
+    """Per-call memory churn: peak traced bytes above baseline, and GC pressure.
+    
+    numpy and cv2 result arrays are traced by tracemalloc, so a call that
+    writes into pooled buffers shows a near-zero peak.
+    """
+    fn()  # let caches and buffer pools settle
+    collections_before = sum(s["collections"] for s in gc.get_stats())
+    peaks: List[int] = []
+    tracemalloc.start()
+    try:
+        for _ in range(iterations):
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn()
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        retained = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    collections = sum(s["collections"] for s in gc.get_stats()) - collections_before
+    return {
+        "alloc_peak_kib": round(statistics.median(peaks) / 1024, 1),
+        "alloc_retained_kib": round(retained / 1024, 1),
+        "gc_collections_per_1k": round(collections * 1000 / iterations, 1),
+    }
+
+
+def build_cases(width: int, height: int) -> Dict[str, Callable[[], object]]:
+    """Benchmark cases for one resolution; unavailable components are skipped
+    
+    "[pooled]" variants reuse a session BufferPool, as the WebSocket path does.
+    """
+    from app.api.tryon import MAX_IMAGE_DIMENSION, validate_image_size
+    from app.cv.buffers import BufferPool
+    from app.cv.frame_formats import RawFrameFormat
+    from app.cv.watch_overlay import WatchOverlay
+    from app.cv.watch_tryon import WatchTryOn
+
+    frame = synthetic_frame(width, height)
+    # At least twice the suite size and past MAX_IMAGE_DIMENSION, so validate_image_size resizes
+    scale = max(2, math.ceil((MAX_IMAGE_DIMENSION + 1) / max(width, height)))
+    oversized = synthetic_frame(width * scale, height * scale)
+    hand = synthetic_hand(width, height)
+    overlay = WatchOverlay(str(WATCH_IMAGE))
+    tryon = WatchTryOn(str(WATCH_IMAGE))
+
+    # Full-frame BGRA layer, as produced by the warp inside WatchOverlay.apply
+    layer = np.zeros((height, width, 4), dtype=np.uint8)
+    layer[height // 3:2 * height // 3, width // 3:2 * width // 3] = (40, 80, 160, 200)
+
+    nv12 = RawFrameFormat(format="nv12", width=min(width, 1280), height=min(height, 720))
+    nv12_bytes = bytes(nv12.nbytes)
+    pool = BufferPool()
+    target = frame.copy()
+
+    def blend_pooled():
+        np.copyto(target, frame)
+        return overlay._blend_transparent(target, layer, pool)
+
+    def apply_pooled():
+        np.copyto(target, frame)
+        return overlay.apply(target, hand, pool)
+
+    second = synthetic_hand(width // 2, height)
+    placements = [overlay.placement(hand), overlay.placement(second)]
+
+    def apply_two_hands():
+        np.copyto(target, frame)
+        return overlay.apply_many(target, placements, pool)
+
+    cases: Dict[str, Callable[[], object]] = {
+        "validate_image_size[oversized]": lambda: validate_image_size(oversized),
+        "WatchOverlay.apply": lambda: overlay.apply(frame.copy(), hand),
+        "WatchOverlay.apply[pooled]": apply_pooled,
+        "WatchOverlay.apply_many[2 hands,pooled]": apply_two_hands,
+        "WatchOverlay._blend_transparent": lambda: overlay._blend_transparent(frame.copy(), layer),
+        "WatchOverlay._blend_transparent[pooled]": blend_pooled,
+        "RawFrameFormat.to_bgr.nv12": lambda: nv12.to_bgr(nv12_bytes),
+        "RawFrameFormat.to_bgr.nv12[pooled]": lambda: nv12.to_bgr(nv12_bytes, pool),
+        "WatchTryOn.process_frame": lambda: tryon.process_frame(frame),
+        "encode.jpeg_q85": lambda: cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85]),
+        "encode.png": lambda: cv2.imencode('.png', frame),
+    }
+
+    try:
+        from app.cv.hand_detector import HandDetector
+        detector = HandDetector(static_image_mode=False)
+        cases["HandDetector.detect"] = lambda: detector.detect(frame)
+    except Exception as e:
+        logging.warning(f"Skipping HandDetector.detect: {e}")
+
+    return cases
+
+
+def build_recording_cases(recording: Path) -> Dict[str, Callable[[], object]]:
+    """Decode and detection cases cycling through the frames of a recording"""
+    from app.core.recording import recorded_frames
+    from app.cv.watch_tryon import WatchTryOn
+
+    encoded = [np.frombuffer(data, np.uint8) for _, data, _ in recorded_frames(recording)]
+    if not encoded:
+        raise SystemExit(f"No frames in {recording}")
+    decoded = [cv2.imdecode(buf, cv2.IMREAD_COLOR) for buf in encoded]
+    tryon = WatchTryOn(str(WATCH_IMAGE))
+    position = {"decode": 0, "detect": 0}
+
+    def next_index(case: str, count: int) -> int:
+        position[case] = (position[case] + 1) % count
+        return position[case]
+
+    return {
+        "imdecode": lambda: cv2.imdecode(encoded[next_index("decode", len(encoded))], cv2.IMREAD_COLOR),
+        "WatchTryOn.process_frame": lambda: tryon.process_frame(decoded[next_index("detect", len(decoded))]),
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True,
+            stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return None
+
+
+def run(
+    resolutions: List[str],
+    iterations: int,
+    warmup: int,
+    only: Optional[str],
+    recording: Optional[Path] = None,
+    allocations: bool = False
+) -> dict:
+    results: Dict[str, dict] = {}
+    suites = [(name, lambda name=name: build_cases(*RESOLUTIONS[name])) for name in resolutions]
+    if recording:
+        suites.append(("recording", lambda: build_recording_cases(recording)))
+    for name, build in suites:
+        for case, fn in build().items():
+            if only and only not in case:
+                continue
+            key = f"{case}@{name}"
+            results[key] = time_call(fn, iterations, warmup)
+            line = f"{key:45s} median {results[key]['median_ms']:9.3f} ms   p95 {results[key]['p95_ms']:9.3f} ms"
+            if allocations:
+                results[key].update(measure_allocations(fn, min(iterations, 20)))
+                line += f"   peak {results[key]['alloc_peak_kib']:10.1f} KiB   gc/1k {results[key]['gc_collections_per_1k']:6.1f}"
+            print(line)
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count(),
+            "cv2_threads": cv2.getNumThreads(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Cases whose median got slower than baseline by more than threshold (fraction)"""
+    regressions = []
+    print(f"\n{'case':45s} {'baseline':>10s} {'current':>10s} {'change':>8s}")
+    for key, stats in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if not base or not base["median_ms"]:
+            continue
+        change = stats["median_ms"] / base["median_ms"] - 1
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{key:45s} {base['median_ms']:10.3f} {stats['median_ms']:10.3f} {change:+8.1%}{flag}")
+        if change > threshold:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the try-on CV hot path")
+    parser.add_argument("--out", type=Path, help="Write JSON results here")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Allowed median slowdown before failing (fraction, default 0.15)")
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", help="Run only cases whose name contains this string")
+    parser.add_argument("--threads", type=int, help="cv2.setNumThreads value")
+    parser.add_argument("--recording", type=Path, help="Also time decode/detect on a .tryrec recording")
+    parser.add_argument("--allocations", action="store_true",
+                        help="Also measure per-call allocation peak and GC collections (tracemalloc)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.threads is not None:
+        cv2.setNumThreads(args.threads)
+
+    current = run(args.resolutions, args.iterations, args.warmup, args.only, args.recording, args.allocations)
+    if args.out:
+        args.out.write_text(json.dumps(current, indent=2))
+        print(f"\nWrote {args.out}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+"""
+Detection accuracy vs latency evaluation
+
+Runs a labeled set of wrist images, or recorded sessions, through the
+landmark pipeline under a matrix of speed settings (model tier, inference
+width, ROI crops, predicted frames) and reports wrist position, width and
+rotation error and recall against latency and CPU time, marking the
+Pareto-optimal configurations.
+
+Labels (labels.json next to the images, or --labels) map file names to
+the hands expected in them, normalized like WatchTryOn landmarks:
+    {"img_001.jpg": {"hands": [{"wrist_x": 0.52, "wrist_y": 0.61,
+                                "wrist_width": 0.14, "rotation": 12.0}]}}
+Recordings have no labels; the reference configuration (full-2hands on
+full-size frames, every frame detected) is used as ground truth.
+
+Usage (from backend/):
+    python -m benchmarks.eval_detection --images wrists/
+    python -m benchmarks.eval_detection --images clip/ --sequence --fps 30 --roi off on --skip 1 2 3
+    python -m benchmarks.eval_detection --recording session.tryrec --input-widths tier 640 320 --out eval.json
+"""
+import argparse
+import itertools
+import json
+import logging
+import math
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_cv import WATCH_IMAGE, git_revision
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+REFERENCE_TIER = "full-2hands"
+
+
+class EvalFrame(NamedTuple):
+    name: str
+    t: float  # seconds since the first frame
+    image: np.ndarray
+    truth: Optional[List[dict]]  # None: label from the reference run
+
+
+class EvalConfig(NamedTuple):
+    tier: str
+    input_width: Optional[int]  # None keeps the tier's own max_input_width
+    roi: bool
+    skip: int  # MotionTracker max_interval; 1 detects every frame
+
+    @property
+    def name(self) -> str:
+        width = "tier" if self.input_width is None else (self.input_width or "full")
+        return f"{self.tier} w={width} roi={'on' if self.roi else 'off'} skip={self.skip}"
+
+
+def load_labeled(directory: Path, labels_path: Optional[Path], fps: float) -> List[EvalFrame]:
+    labels = json.loads((labels_path or directory / "labels.json").read_text())
+    frames = []
+    images = sorted(p for p in directory.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS and p.name in labels)
+    for i, path in enumerate(images):
+        image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if image is None:
+            logging.warning(f"Skipping undecodable image {path}")
+            continue
+        frames.append(EvalFrame(path.name, i / fps, image, labels[path.name].get("hands", [])))
+    return frames
+
+
+def load_recording(path: Path, max_frames: int) -> List[EvalFrame]:
+    from app.core.recording import recorded_frames
+
+    frames = []
+    for i, (t, image_bytes, _) in enumerate(recorded_frames(path)):
+        if max_frames and i >= max_frames:
+            break
+        image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if image is not None:
+            frames.append(EvalFrame(f"{path.name}#{i}", t, image, None))
+    return frames
+
+
+def build_matrix(tiers: List[str], widths: List[Optional[int]], rois: List[bool], skips: List[int]) -> List[EvalConfig]:
+    return [EvalConfig(*combo) for combo in itertools.product(tiers, widths, rois, skips)]
+
+
+def config_tier(config: EvalConfig):
+    from app.core.tiers import get_tier
+
+    tier = get_tier(config.tier)
+    if config.input_width is None:
+        return tier
+    return tier.model_copy(update={"max_input_width": config.input_width})
+
+
+def run_config(tryon, frames: List[EvalFrame], config: EvalConfig) -> List[dict]:
+    """Per-frame hands and cost for one configuration, mirroring the WebSocket loop"""
+    from app.cv.buffers import BufferPool
+    from app.cv.roi import CropRect, ROIHinter, to_full_frame
+    from app.cv.tracking import MotionTracker
+
+    tier = config_tier(config)
+    buffers = BufferPool()
+    roi = ROIHinter() if config.roi else None
+    tracker = MotionTracker(max_interval=config.skip)
+    tryon.process_frame(frames[0].image, buffers, tier)  # warm up the detector for this tier
+
+    outputs = []
+    for frame in frames:
+        image, crop = frame.image, None
+        if roi is not None and roi.suggest():
+            # The client would upload only this region; cropping is not server cost
+            h, w = image.shape[:2]
+            rect = roi.suggest()
+            x0, y0 = int(rect["x"] * w), int(rect["y"] * h)
+            x1, y1 = min(w, x0 + max(1, round(rect["w"] * w))), min(h, y0 + max(1, round(rect["h"] * h)))
+            crop = CropRect(x=x0 / w, y=y0 / h, w=(x1 - x0) / w, h=(y1 - y0) / h)
+            image = np.ascontiguousarray(image[y0:y1, x0:x1])
+
+        tracker.adapt(1.0)  # worst case: the tracker may predict up to `skip - 1` frames in a row
+        wall, cpu = time.perf_counter(), time.process_time()
+        predict = config.skip > 1 and tracker.tracking and not tracker.should_detect() \
+            and (roi is None or not roi.wants_full_frame)
+        if predict:
+            hands = tracker.predict(frame.t)  # every tracked hand, as the WebSocket loop sends
+        else:
+            result = tryon.process_frame(image, buffers, tier)
+            if crop is not None and result.get("hands_detected"):
+                result["hands"] = [to_full_frame(hand, crop) for hand in result.get("hands", [])]
+                result["landmarks"] = result["hands"][0] if result["hands"] else None
+            tracker.observe(result, frame.t)
+            if roi is not None:
+                roi.observe_frame(image.shape[1], image.shape[0], crop)
+                roi.observe(result, crop)
+            hands = result.get("hands", []) if result.get("hands_detected") else []
+        outputs.append({
+            "hands": hands,
+            "detected": not predict,
+            "latency_ms": (time.perf_counter() - wall) * 1000,
+            "cpu_ms": (time.process_time() - cpu) * 1000
+        })
+    return outputs
+
+
+def match_hands(truth: List[dict], predicted: List[dict], radius: float) -> List[Tuple[dict, dict]]:
+    """Greedy nearest-wrist matching within `radius` ground-truth wrist widths"""
+    pairs = sorted(
+        (math.hypot(p["wrist_x"] - g["wrist_x"], p["wrist_y"] - g["wrist_y"]) / max(g["wrist_width"], 1e-6), gi, pi)
+        for gi, g in enumerate(truth) for pi, p in enumerate(predicted)
+    )
+    used_truth, used_pred, matches = set(), set(), []
+    for distance, gi, pi in pairs:
+        if distance > radius or gi in used_truth or pi in used_pred:
+            continue
+        used_truth.add(gi)
+        used_pred.add(pi)
+        matches.append((truth[gi], predicted[pi]))
+    return matches
+
+
+def _mean_p95(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"mean": None, "p95": None}
+    ordered = sorted(values)
+    return {
+        "mean": round(statistics.fmean(ordered), 4),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4)
+    }
+
+
+def score(truth: List[List[dict]], outputs: List[dict], radius: float) -> dict:
+    """Accuracy (errors relative to wrist width, rotation in degrees) and cost summary"""
+    position, width, rotation = [], [], []
+    expected = found = false_positives = 0
+    for hands_truth, output in zip(truth, outputs):
+        matches = match_hands(hands_truth, output["hands"], radius)
+        expected += len(hands_truth)
+        found += len(matches)
+        false_positives += len(output["hands"]) - len(matches)
+        for g, p in matches:
+            gw = max(g["wrist_width"], 1e-6)
+            position.append(math.hypot(p["wrist_x"] - g["wrist_x"], p["wrist_y"] - g["wrist_y"]) / gw)
+            width.append(abs(p["wrist_width"] - g["wrist_width"]) / gw)
+            rotation.append(abs((p["rotation"] - g["rotation"] + 180) % 360 - 180))
+    return {
+        "frames": len(outputs),
+        "recall": round(found / expected, 4) if expected else None,
+        "false_positives": false_positives,
+        "detect_rate": round(sum(o["detected"] for o in outputs) / max(len(outputs), 1), 4),
+        "position_error": _mean_p95(position),
+        "width_error": _mean_p95(width),
+        "rotation_error_deg": _mean_p95(rotation),
+        "latency_ms": _mean_p95([o["latency_ms"] for o in outputs]),
+        "cpu_ms": _mean_p95([o["cpu_ms"] for o in outputs]),
+    }
+
+
+def mark_pareto(rows: List[dict]) -> None:
+    """Flag configurations no other one beats on latency, position error and misses at once"""
+    def objectives(row: dict) -> Tuple[float, float, float]:
+        s = row["summary"]
+        error = s["position_error"]["mean"]
+        return (
+            s["latency_ms"]["mean"],
+            error if error is not None else math.inf,
+            1 - (s["recall"] if s["recall"] is not None else 1.0)
+        )
+
+    for row in rows:
+        mine = objectives(row)
+        row["pareto"] = not any(
+            all(o <= m for o, m in zip(other, mine)) and other != mine
+            for other in (objectives(r) for r in rows if r is not row)
+        )
+
+
+def format_table(rows: List[dict]) -> str:
+    def fmt(value: Optional[float], spec: str) -> str:
+        return format(value, spec) if value is not None else "-"
+
+    lines = [
+        f"{'':2s}{'configuration':42s} {'recall':>7s} {'pos err':>8s} {'p95':>7s} {'width':>7s} "
+        f"{'rot°':>6s} {'detect':>7s} {'lat ms':>8s} {'p95':>8s} {'cpu ms':>8s}"
+    ]
+    for row in sorted(rows, key=lambda r: r["summary"]["latency_ms"]["mean"]):
+        s = row["summary"]
+        lines.append(
+            f"{'*' if row['pareto'] else ' ':2s}{row['config']:42s} {fmt(s['recall'], '7.1%')} "
+            f"{fmt(s['position_error']['mean'], '8.3f')} {fmt(s['position_error']['p95'], '7.3f')} "
+            f"{fmt(s['width_error']['mean'], '7.3f')} {fmt(s['rotation_error_deg']['mean'], '6.1f')} "
+            f"{s['detect_rate']:7.0%} {s['latency_ms']['mean']:8.2f} {s['latency_ms']['p95']:8.2f} "
+            f"{s['cpu_ms']['mean']:8.2f}"
+        )
+    lines.append("\n* Pareto-optimal (latency vs position error vs misses); errors are relative to wrist width;\n"
+                 "  predicted frames (skip > 1) are scored on every tracked hand")
+    return "\n".join(lines)
+
+
+def evaluate(frames: List[EvalFrame], configs: List[EvalConfig], radius: float) -> dict:
+    from app.cv.watch_tryon import WatchTryOn
+
+    tryon = WatchTryOn(str(WATCH_IMAGE))
+    truth = [frame.truth for frame in frames]
+    if any(t is None for t in truth):
+        reference = EvalConfig(REFERENCE_TIER, 0, False, 1)
+        truth = [o["hands"] for o in run_config(tryon, frames, reference)]
+
+    rows = []
+    for config in configs:
+        summary = score(truth, run_config(tryon, frames, config), radius)
+        rows.append({"config": config.name, "settings": config._asdict(), "summary": summary})
+        print(f"{config.name:42s} recall {summary['recall'] if summary['recall'] is not None else '-'}"
+              f"  latency {summary['latency_ms']['mean']:.2f} ms", file=sys.stderr)
+    mark_pareto(rows)
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "frames": len(frames),
+            "ground_truth": "labels" if frames[0].truth is not None else f"reference ({REFERENCE_TIER}, full size)",
+            "match_radius": radius,
+            "opencv": cv2.__version__,
+        },
+        "results": rows,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Evaluate detection accuracy against latency")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--images", type=Path, help="Directory of labeled wrist images")
+    source.add_argument("--recording", type=Path, help=".tryrec session; labeled by the reference run")
+    parser.add_argument("--labels", type=Path, help="Labels JSON (default: <images>/labels.json)")
+    parser.add_argument("--sequence", action="store_true",
+                        help="Treat the sorted images as consecutive frames (enables --roi and --skip)")
+    parser.add_argument("--fps", type=float, default=30.0, help="Frame rate of an image sequence")
+    parser.add_argument("--max-frames", type=int, default=0, help="Limit recording frames; 0 = all")
+    parser.add_argument("--tiers", nargs="+", default=["lite", "full", "full-2hands"])
+    parser.add_argument("--input-widths", nargs="+", default=["tier"],
+                        help="Inference widths: 'tier' (tier default), 0 (full size) or pixels")
+    parser.add_argument("--roi", nargs="+", choices=["off", "on"], default=["off"])
+    parser.add_argument("--skip", nargs="+", type=int, default=[1], help="Tracker max intervals")
+    parser.add_argument("--match-radius", type=float, default=1.0,
+                        help="Max wrist distance for a match, in ground-truth wrist widths")
+    parser.add_argument("--threads", type=int, help="cv2.setNumThreads value")
+    parser.add_argument("--allow-mock", action="store_true", help="Run without a hand model (mock landmarks)")
+    parser.add_argument("--out", type=Path, help="Write JSON results here")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.threads is not None:
+        cv2.setNumThreads(args.threads)
+
+    from app.cv.models import get_model_registry
+    if get_model_registry().get("full") is None and not args.allow_mock:
+        parser.error("hand model not found; accuracy of mock landmarks is meaningless (--allow-mock to run anyway)")
+
+    if args.images:
+        frames = load_labeled(args.images, args.labels, args.fps)
+        sequential = args.sequence
+    else:
+        frames = load_recording(args.recording, args.max_frames)
+        sequential = True
+    if not frames:
+        parser.error("no frames to evaluate")
+
+    rois = [r == "on" for r in args.roi]
+    skips = sorted(set(max(1, s) for s in args.skip))
+    if not sequential and (rois != [False] or skips != [1]):
+        print("ROI and frame skipping need consecutive frames (--sequence); evaluating them off", file=sys.stderr)
+        rois, skips = [False], [1]
+    widths = [None if w == "tier" else int(w) for w in args.input_widths]
+
+    report = evaluate(frames, build_matrix(args.tiers, widths, rois, skips), args.match_radius)
+    print(format_table(report["results"]))
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+        print(f"\nWrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
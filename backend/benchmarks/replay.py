@@ -0,0 +1,97 @@
+"""
+Deterministic replay of recorded try-on sessions
+
+Pushes the frames of a .tryrec recording back through the landmark
+pipeline with the original timing, an accelerated clock, or as fast as
+possible, and reports per-frame latency and detections.
+
+Usage (from backend/):
+    python -m benchmarks.replay session.tryrec                 # original timing
+    python -m benchmarks.replay session.tryrec --speed 4       # 4x faster
+    python -m benchmarks.replay session.tryrec --speed 0 --out run.json
+"""
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from app.core.recording import read_recording, recorded_frames
+
+
+def replay(path: Path, speed: float, watch_override: Optional[str]) -> dict:
+    from app.api.tryon import get_watch_image_path, get_watch_tryon
+
+    meta = next(item.data for item in read_recording(path) if item.kind == "meta")
+    frames: List[dict] = []
+    lag_ms: List[float] = []
+    clock_start = time.perf_counter()
+
+    for t, image_bytes, watch_id in recorded_frames(path):
+        if speed > 0:
+            due = clock_start + t / speed
+            now = time.perf_counter()
+            if due > now:
+                time.sleep(due - now)
+            lag_ms.append(max(0.0, time.perf_counter() - due) * 1000)
+
+        watch_path = get_watch_image_path(watch_override or watch_id or "1")
+        started = time.perf_counter()
+        img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            frames.append({"t": round(t, 4), "error": "decode"})
+            continue
+        result = get_watch_tryon(str(watch_path)).process_frame(img)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        frames.append({
+            "t": round(t, 4),
+            "latency_ms": round(elapsed_ms, 3),
+            "hands_detected": bool(result.get("hands_detected")),
+            "landmarks": result.get("landmarks"),
+        })
+
+    latencies = [f["latency_ms"] for f in frames if "latency_ms" in f]
+    detected = sum(1 for f in frames if f.get("hands_detected"))
+    return {
+        "recording": str(path),
+        "meta": meta,
+        "speed": speed,
+        "summary": {
+            "frames": len(frames),
+            "decode_errors": sum(1 for f in frames if f.get("error")),
+            "detection_rate": round(detected / len(frames), 4) if frames else 0.0,
+            "latency_ms_p50": round(statistics.median(latencies), 3) if latencies else 0.0,
+            "latency_ms_max": round(max(latencies), 3) if latencies else 0.0,
+            "schedule_lag_ms_max": round(max(lag_ms), 3) if lag_ms else 0.0,
+            "wall_seconds": round(time.perf_counter() - clock_start, 3),
+        },
+        "frames": frames,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a recorded try-on session")
+    parser.add_argument("recording", type=Path)
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Clock multiplier; 0 replays as fast as possible")
+    parser.add_argument("--watch-id", help="Override the recorded watch")
+    parser.add_argument("--out", type=Path, help="Write per-frame results as JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    report = replay(args.recording, args.speed, args.watch_id)
+    print(json.dumps(report["summary"], indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
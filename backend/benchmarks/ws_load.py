@@ -0,0 +1,313 @@
+"""
+WebSocket load generator for the try-on endpoint
+
+Drives N concurrent simulated clients that send frames at a fixed rate and
+reports round-trip latency percentiles, achieved fps per session, drops and
+server CPU.
+
+Usage (from backend/):
+    # In-process uvicorn (server and clients share this process's CPU)
+    python -m benchmarks.ws_load --clients 8 --fps 15 --duration 20
+
+    # Separate local uvicorn, server CPU read from its /metrics
+    python -m benchmarks.ws_load --spawn --clients 32
+
+    # Existing server
+    python -m benchmarks.ws_load --url ws://127.0.0.1:8000
+
+    # Replay frames captured with TRYON_RECORD_DIR
+    python -m benchmarks.ws_load --recording recordings/session.tryrec
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import List, Optional
+
+import cv2
+import websockets
+
+from app.core.recording import recorded_frames
+from benchmarks.bench_cv import RESOLUTIONS, synthetic_frame
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Reply types that complete a frame round trip
+FRAME_REPLIES = {"landmarks", "no_hands"}
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def load_frames(
+    frames_dir: Optional[Path],
+    resolution: str,
+    quality: int,
+    recording: Optional[Path] = None
+) -> List[str]:
+    """Base64 data-URI payloads from a recording, a directory of images, or synthesized"""
+    if recording:
+        payloads = []
+        for _, image_bytes, _ in recorded_frames(recording):
+            mime = "image/png" if image_bytes.startswith(b"\x89PNG") else "image/jpeg"
+            payloads.append(f"data:{mime};base64," + base64.b64encode(image_bytes).decode('ascii'))
+        if not payloads:
+            raise SystemExit(f"No frames in {recording}")
+        return payloads
+
+    images = []
+    if frames_dir:
+        for path in sorted(frames_dir.iterdir()):
+            img = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if img is not None:
+                images.append(img)
+        if not images:
+            raise SystemExit(f"No readable images in {frames_dir}")
+    else:
+        width, height = RESOLUTIONS[resolution]
+        images = [synthetic_frame(width, height, seed) for seed in range(10)]
+
+    payloads = []
+    for img in images:
+        _, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        payloads.append("data:image/jpeg;base64," + base64.b64encode(buffer).decode('ascii'))
+    return payloads
+
+
+def frame_message(payload: str, watch_id: str) -> str:
+    return json.dumps({"type": "frame", "image": payload, "watch_id": watch_id})
+
+
+class SessionStats:
+    def __init__(self, index: int):
+        self.index = index
+        self.rtts_ms: List[float] = []
+        self.sent = 0
+        self.completed = 0
+        self.busy = 0
+        self.errors = 0
+        self.skipped = 0  # ticks missed while waiting for a reply
+        self.started = 0.0
+        self.finished = 0.0
+
+    @property
+    def fps(self) -> float:
+        elapsed = self.finished - self.started
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+
+async def run_client(
+    index: int,
+    url: str,
+    endpoint: str,
+    frames: List[str],
+    fps: float,
+    duration: float,
+    watch_id: str,
+    reply_timeout: float
+) -> SessionStats:
+    stats = SessionStats(index)
+    interval = 1.0 / fps
+    async with websockets.connect(url + endpoint, max_size=None) as ws:
+        stats.started = time.perf_counter()
+        deadline = stats.started + duration
+        next_tick = stats.started
+        frame_index = index  # stagger clients across the frame set
+        while time.perf_counter() < deadline:
+            message = frame_message(frames[frame_index % len(frames)], watch_id)
+            frame_index += 1
+            sent_at = time.perf_counter()
+            await ws.send(message)
+            stats.sent += 1
+
+            try:
+                while True:
+                    reply = json.loads(await asyncio.wait_for(ws.recv(), reply_timeout))
+                    kind = reply.get("type")
+                    if kind in FRAME_REPLIES:
+                        stats.completed += 1
+                        stats.rtts_ms.append((time.perf_counter() - sent_at) * 1000)
+                        break
+                    if kind == "busy":
+                        stats.busy += 1
+                        break
+                    if kind == "error":
+                        stats.errors += 1
+                        break
+                    # control messages (quality, ...) do not complete the frame
+            except asyncio.TimeoutError:
+                stats.errors += 1
+
+            next_tick += interval
+            now = time.perf_counter()
+            if now > next_tick:
+                missed = int((now - next_tick) / interval)
+                stats.skipped += missed
+                next_tick += missed * interval
+            else:
+                await asyncio.sleep(next_tick - now)
+        stats.finished = time.perf_counter()
+    return stats
+
+
+def scrape_cpu_seconds(http_url: str) -> Optional[float]:
+    """process_cpu_seconds_total from the server's /metrics, if exposed"""
+    try:
+        with urllib.request.urlopen(http_url + "/metrics", timeout=5) as resp:
+            text = resp.read().decode()
+    except Exception:
+        return None
+    match = re.search(r"^process_cpu_seconds_total (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_server_blocking(http_url: str, timeout: float = 30.0) -> None:
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        try:
+            with urllib.request.urlopen(http_url + "/health", timeout=2):
+                return
+        except Exception:
+            time.sleep(0.2)
+    raise SystemExit(f"Server at {http_url} did not become healthy")
+
+
+def summarize(sessions: List[SessionStats], wall: float, cpu_seconds: Optional[float], cpu_scope: str) -> dict:
+    rtts = [r for s in sessions for r in s.rtts_ms]
+    per_session_fps = [round(s.fps, 2) for s in sessions]
+    return {
+        "clients": len(sessions),
+        "wall_seconds": round(wall, 2),
+        "frames_sent": sum(s.sent for s in sessions),
+        "frames_completed": sum(s.completed for s in sessions),
+        "dropped_busy": sum(s.busy for s in sessions),
+        "errors": sum(s.errors for s in sessions),
+        "skipped_ticks": sum(s.skipped for s in sessions),
+        "rtt_ms": {
+            "p50": round(percentile(rtts, 0.50), 2),
+            "p95": round(percentile(rtts, 0.95), 2),
+            "p99": round(percentile(rtts, 0.99), 2),
+            "mean": round(statistics.fmean(rtts), 2) if rtts else 0.0,
+        },
+        "fps_per_session": {
+            "min": min(per_session_fps, default=0.0),
+            "median": statistics.median(per_session_fps) if per_session_fps else 0.0,
+            "max": max(per_session_fps, default=0.0),
+            "all": per_session_fps,
+        },
+        "cpu": {
+            "scope": cpu_scope,
+            "seconds": round(cpu_seconds, 2) if cpu_seconds is not None else None,
+            "cores_used": round(cpu_seconds / wall, 2) if cpu_seconds is not None and wall else None,
+        },
+    }
+
+
+async def run_load(args) -> dict:
+    frames = load_frames(args.frames_dir, args.resolution, args.jpeg_quality, args.recording)
+    server = None
+    server_task = None
+    process = None
+
+    if args.url:
+        url = args.url.rstrip("/")
+    elif args.spawn:
+        port = free_port()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+             "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR
+        )
+        url = f"ws://127.0.0.1:{port}"
+    else:
+        import uvicorn
+        from app.main import app
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        server_task = asyncio.create_task(server.serve())
+        url = f"ws://127.0.0.1:{port}"
+
+    http_url = url.replace("ws://", "http://").replace("wss://", "https://")
+    try:
+        in_process = server is not None
+        if in_process:
+            while not server.started:
+                if server_task.done():
+                    server_task.result()
+                await asyncio.sleep(0.05)
+        else:
+            await asyncio.to_thread(wait_for_server_blocking, http_url)
+        cpu_before = time.process_time() if in_process else scrape_cpu_seconds(http_url)
+
+        started = time.perf_counter()
+        sessions = await asyncio.gather(*[
+            run_client(i, url, args.endpoint, frames, args.fps, args.duration,
+                       args.watch_id, args.reply_timeout)
+            for i in range(args.clients)
+        ])
+        wall = time.perf_counter() - started
+
+        if in_process:
+            cpu_seconds = time.process_time() - cpu_before
+            cpu_scope = "process (server + load clients)"
+        else:
+            cpu_after = scrape_cpu_seconds(http_url)
+            cpu_seconds = cpu_after - cpu_before if cpu_before is not None and cpu_after is not None else None
+            cpu_scope = "server (/metrics)"
+        return summarize(sessions, wall, cpu_seconds, cpu_scope)
+    finally:
+        if server is not None:
+            server.should_exit = True
+            await server_task
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the try-on WebSocket endpoint")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="Existing server, e.g. ws://127.0.0.1:8000")
+    target.add_argument("--spawn", action="store_true", help="Start a local uvicorn subprocess")
+    parser.add_argument("--endpoint", default="/api/tryon/ws", help="Try-on WebSocket path")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--fps", type=float, default=15.0, help="Send rate per client")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per client")
+    parser.add_argument("--resolution", default="480p", choices=list(RESOLUTIONS))
+    parser.add_argument("--jpeg-quality", type=int, default=70)
+    parser.add_argument("--frames-dir", type=Path, help="Replay images from this directory")
+    parser.add_argument("--recording", type=Path, help="Replay frames from a .tryrec recording")
+    parser.add_argument("--watch-id", default="1")
+    parser.add_argument("--reply-timeout", type=float, default=5.0)
+    parser.add_argument("--out", type=Path, help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(run_load(args))
+    print(json.dumps(report, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Tests for CV admission slot accounting under cancellation
+"""
+import asyncio
+import threading
+
+from app.core.admission import CVAdmission, Priority
+
+
+def blocking(event: threading.Event) -> str:
+    event.wait(5)
+    return "done"
+
+
+def test_cancelled_run_keeps_slot_until_worker_finishes():
+    async def scenario():
+        admission = CVAdmission(max_concurrency=1, max_queue=4, queue_timeout=5)
+        release = threading.Event()
+        task = asyncio.create_task(admission.run(blocking, release, key="a"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.sleep(0.05)
+        # The worker thread is still busy, so the slot must stay taken
+        assert admission.in_flight == 1
+        release.set()
+        await asyncio.sleep(0.1)
+        assert admission.in_flight == 0
+        admission.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_cancel_after_handoff_passes_slot_on():
+    async def scenario():
+        admission = CVAdmission(max_concurrency=1, max_queue=4, queue_timeout=5)
+        first = threading.Event()
+        running = asyncio.create_task(admission.run(blocking, first, key="a"))
+        await asyncio.sleep(0.05)
+        handed = asyncio.create_task(admission.run(blocking, threading.Event(), key="b"))
+        third = threading.Event()
+        waiting = asyncio.create_task(admission.run(blocking, third, key="c", priority=Priority.BULK))
+        await asyncio.sleep(0.05)
+        assert admission.queue_depth == 2
+
+        first.set()
+        # Cancel "b" in the loop step where _release hands it the slot, before it resumes
+        while admission.queue_depth == 2:
+            await asyncio.sleep(0)
+        handed.cancel()
+        assert await running == "done"
+        await asyncio.sleep(0.05)
+        assert handed.cancelled()
+        # The slot went on to "c" instead of leaking
+        assert admission.in_flight == 1 and admission.queue_depth == 0
+        third.set()
+        assert await waiting == "done"
+        await asyncio.sleep(0.05)
+        assert admission.in_flight == 0
+        admission.shutdown()
+
+    asyncio.run(scenario())
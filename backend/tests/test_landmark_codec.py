@@ -0,0 +1,40 @@
+"""
+Round-trip tests for the binary landmark codec
+"""
+import math
+
+from app.core.landmark_codec import DELTA_STEP, KIND_DELTA, KIND_KEYFRAME, QUANT_MAX, LandmarkDecoder, LandmarkEncoder
+
+
+def moving_hand(t: float) -> dict:
+    """A wrist sweeping across a 640 px frame at ~30 fps while turning"""
+    return {
+        "wrist_x": 0.5 + 0.2 * math.sin(t),
+        "wrist_y": 0.6 + 0.05 * math.cos(2 * t),
+        "wrist_width": 0.15 + 0.01 * math.sin(t),
+        "rotation": 20 * math.sin(t),
+    }
+
+
+def test_round_trip_with_realistic_motion():
+    encoder, decoder = LandmarkEncoder(), LandmarkDecoder()
+    kinds = []
+    for i in range(120):
+        hand = moving_hand(i / 30 * 2)
+        packet = encoder.encode([hand])
+        kinds.append(packet[0])
+        decoded = decoder.decode(packet)["hands"][0]
+        for field in ("wrist_x", "wrist_y", "wrist_width"):
+            assert abs(decoded[field] - hand[field]) <= DELTA_STEP / QUANT_MAX
+        assert abs((decoded["rotation"] - hand["rotation"] + 180) % 360 - 180) <= DELTA_STEP / QUANT_MAX * 360
+
+    # Normal motion fits in deltas; keyframes come from the interval, not overflow
+    assert kinds.count(KIND_DELTA) > kinds.count(KIND_KEYFRAME) * 10
+
+
+def test_large_jump_sends_keyframe():
+    encoder, decoder = LandmarkEncoder(), LandmarkDecoder()
+    decoder.decode(encoder.encode([moving_hand(0)]))
+    packet = encoder.encode([{**moving_hand(0), "wrist_x": 0.05}])
+    assert packet[0] == KIND_KEYFRAME
+    assert abs(decoder.decode(packet)["hands"][0]["wrist_x"] - 0.05) < 1 / QUANT_MAX
@@ -0,0 +1,25 @@
+"""
+Tests for the quality and model tier feedback loops
+"""
+from app.core.quality import QualityController
+from app.core.tiers import TierGovernor, get_tier
+
+
+def test_tier_steps_down_only_after_quality_bottoms_out():
+    quality = QualityController(100, start_level=2, cooldown=0)
+    tiers = TierGovernor(get_tier("full"), 100, quality=quality, cooldown=0)
+
+    levels_at_tier_change = []
+    for _ in range(200):
+        quality.observe(0, 300)
+        if tiers.observe(300) is not None:
+            levels_at_tier_change.append(quality.level)
+    assert quality.level == 0
+    assert tiers.tier.name == "lite"
+    assert levels_at_tier_change == [0]
+
+    for _ in range(200):
+        quality.observe(0, 10)
+        tiers.observe(10)
+    assert tiers.tier.name == "full"
+    assert quality.level > 0
@@ -0,0 +1,65 @@
+"""
+Tests for per-hand motion tracking between detections
+"""
+import cv2
+import numpy as np
+
+from app.cv.tracking import MotionTracker
+from app.cv.watch_tryon import WatchTryOn
+
+
+def two_hands(t: float) -> dict:
+    """Detector result with a left hand moving right and a right hand moving left"""
+    left = {"wrist_x": 0.25 + 0.3 * t, "wrist_y": 0.6, "wrist_width": 0.12, "rotation": 10.0, "handedness": "Left"}
+    right = {"wrist_x": 0.75 - 0.3 * t, "wrist_y": 0.5, "wrist_width": 0.12, "rotation": 350.0, "handedness": "Right"}
+    return {"hands_detected": True, "landmarks": left, "hands": [left, right]}
+
+
+def test_predicted_frame_keeps_both_hands():
+    tracker = MotionTracker(max_interval=3)
+    for i in range(3):
+        tracker.observe(two_hands(i / 30), i / 30)
+    tracker.adapt(1.0)
+    assert not tracker.should_detect()
+
+    hands = tracker.predict(3 / 30)
+    assert [h["handedness"] for h in hands] == ["Left", "Right"]
+    expected = two_hands(3 / 30)["hands"]
+    for hand, truth in zip(hands, expected):
+        assert abs(hand["wrist_x"] - truth["wrist_x"]) < 0.25 * truth["wrist_width"]
+        assert abs((hand["rotation"] - truth["rotation"] + 180) % 360 - 180) < 1
+
+    # Swapped detector order is matched back to the right tracks
+    swapped = two_hands(4 / 30)
+    swapped["hands"].reverse()
+    tracker.observe(swapped, 4 / 30)
+    assert tracker.error < tracker.error_budget
+
+
+def test_predicted_two_hand_result_renders_both_watches(tmp_path, monkeypatch):
+    watch = np.zeros((40, 40, 4), np.uint8)
+    watch[:] = (0, 0, 255, 255)
+    cv2.imwrite(str(tmp_path / "watch.png"), watch)
+    tryon = WatchTryOn(str(tmp_path / "watch.png"))
+
+    calls = []
+    apply_many = tryon.overlay.apply_many
+
+    def spy(frame, placements, buffers=None):
+        calls.append(placements)
+        return apply_many(frame, placements, buffers)
+
+    monkeypatch.setattr(tryon.overlay, "apply_many", spy)
+
+    tracker = MotionTracker(max_interval=3)
+    for i in range(3):
+        tracker.observe(two_hands(i / 30), i / 30)
+    # Built as the WebSocket loop builds a predicted frame's result
+    hands = tracker.predict(3 / 30)
+    result = {"hands_detected": True, "landmarks": hands[0], "hands": hands}
+
+    frame = tryon.render(np.zeros((240, 320, 3), np.uint8), result)
+    assert len(calls) == 1 and len(calls[0]) == 2
+    for hand in hands:
+        x, y = int(hand["wrist_x"] * 320), int(hand["wrist_y"] * 240)
+        assert frame[y, x, 2] > 200